@@ -11,7 +11,7 @@ class BreadthFirstSearch:
 
     def __init__(self, graph):
         if isinstance(graph, AdjacencyMatrix):
-            graph = AdjacencyList(graph)
+            graph = graph.to_adjacency_list()
         self.graph = graph
         self.DEPTH_TOKEN = -1
         # Each breadth first search layer gets separated by a DEPTH_TOKEN.
@@ -9,7 +9,7 @@ class BridgeDetectionAlgorithm:
 
     def __init__(self, graph):
         if isinstance(graph, AdjacencyMatrix):
-            graph = AdjacencyList(graph)
+            graph = graph.to_adjacency_list()
         self.graph = graph
         n = len(graph)
         self.n = n
@@ -10,7 +10,7 @@ class DepthFirstSearch:
 
     def __init__(self, graph):
         if isinstance(graph, AdjacencyMatrix):
-            graph = AdjacencyList(graph)
+            graph = graph.to_adjacency_list()
         self.graph = graph
         n = len(self.graph)
         self.n = n
@@ -0,0 +1,225 @@
+from util.graph_structures import AdjacencyList, AdjacencyMatrix
+from util.data_structures import IndexedPriorityQueue
+from util.graph_io import map_file
+from algorithms.path_finding.dijkstra import DijkstraAlgorithm
+from array import array
+import math
+import struct
+import sys
+
+class AStarAlgorithm:
+    """
+    A* search finds the shortest path from a start node to an end node like Dijkstra's algorithm,
+    but orders the priority queue by dist[node] + heuristic(node, end), where the heuristic is a
+    lower bound of the remaining distance. Good bounds (straight-line distance on spatial graphs,
+    or the landmark bounds of LandmarkHeuristic) steer the search towards the end node so far
+    fewer nodes are settled. Without a heuristic A* behaves exactly like Dijkstra.
+    The heuristic must be admissible (never overestimate); nodes are reopened if a shorter path to
+    them is found later, so it does not need to be consistent.
+    Time Complexity: O((E + V)log(V)) in the worst case
+    """
+
+    def __init__(self, graph, heuristic=None):
+        if isinstance(graph, AdjacencyMatrix):
+            graph = graph.to_adjacency_list()
+        self.graph = graph
+        n = len(graph)
+        self.n = n
+        self.heuristic = heuristic if heuristic is not None else (lambda node, end: 0)
+        # Same workspace as DijkstraAlgorithm, reset after each query
+        self.prev = [None] * n
+        self.dist = [math.inf] * n
+        self.touched = []
+
+
+    def reset(self):
+        for node in self.touched:
+            self.prev[node] = None
+            self.dist[node] = math.inf
+        self.touched.clear()
+
+
+    def solve(self, start, end):
+        # Run A* from 'start' and return the shortest distance to 'end', or math.inf if there is
+        # no path between them.
+        self.reset()
+        self.dist[start] = 0
+        self.touched.append(start)
+        heuristic = self.heuristic
+
+        ipq = IndexedPriorityQueue()
+        ipq.push(start, heuristic(start, end))
+
+        while not ipq.is_empty():
+            node_from, _ = ipq.pop()
+            # Once the end node is popped its distance cannot get any better.
+            if node_from == end:
+                return self.dist[end]
+
+            for node_to, edge_cost in self.graph[node_from]:
+                # Relax edge by updating minimum cost if applicable.
+                new_dist = self.dist[node_from] + edge_cost
+                if new_dist < self.dist[node_to]:
+                    if self.dist[node_to] == math.inf:
+                        self.touched.append(node_to)
+                    self.prev[node_to] = node_from
+                    self.dist[node_to] = new_dist
+                    # Pushing again also reopens a node that was already settled.
+                    estimate = heuristic(node_to, end)
+                    if estimate != math.inf:
+                        ipq.push(node_to, new_dist + estimate)
+
+        # End node is unreachable
+        return math.inf
+
+
+    def reconstruct_path(self, start, end):
+        # Reconstructs the shortest path (of nodes) from 'start' to 'end' inclusive. If 'start' and
+        # 'end' are not connected then an empty array is returned.
+        if end < 0 or end >= self.n:
+            raise ValueError("Invalid node index")
+        if start < 0 or start >= self.n:
+            raise ValueError("Invalid node index")
+        if self.solve(start, end) == math.inf:
+            return []
+        path = []
+        at = end
+        while at is not None:
+            path.append(at)
+            at = self.prev[at]
+        path.reverse()
+        return path
+
+
+def euclidean_heuristic(coordinates):
+    # Returns a heuristic giving the straight-line distance between two nodes, where
+    # coordinates[i] is the (x, y, ...) position of node i. It is admissible as long as no edge
+    # is shorter than the distance between its endpoints.
+    def heuristic(node, end):
+        return math.dist(coordinates[node], coordinates[end])
+    return heuristic
+
+
+class LandmarkHeuristic:
+    """
+    ALT (A*, Landmarks, Triangle inequality) preprocessing. A few landmark nodes are chosen and the
+    distances from every landmark to every node and from every node to every landmark are
+    precomputed. By the triangle inequality, for any landmark L:
+        d(v, t) >= d(L, t) - d(L, v)    and    d(v, t) >= d(v, L) - d(t, L)
+    and the largest of these bounds is used as the A* heuristic. Landmarks are picked with the
+    farthest selection strategy: each new landmark is the node farthest from those already chosen.
+    The tables are flat arrays of doubles (landmark-major) and can be saved to and memory-mapped
+    back from a binary file.
+    Preprocessing: k runs of Dijkstra forward and k on the reversed graph. Space: O(k * V)
+    """
+
+    MAGIC = b'GTALT1'
+    HEADER = struct.Struct('<6s2xQQ')
+
+    def __init__(self, graph, landmarks=4):
+        # 'landmarks' is either the number of landmarks to select or a list of landmark nodes.
+        if isinstance(graph, AdjacencyMatrix):
+            graph = graph.to_adjacency_list()
+        n = len(graph)
+        self.n = n
+        forward = DijkstraAlgorithm(graph)
+        backward = DijkstraAlgorithm(graph.to_reversed())
+
+        if isinstance(landmarks, int):
+            landmarks = self.select_landmarks(forward, min(landmarks, n))
+        self.landmarks = array('q', landmarks)
+        self.from_landmark = array('d')
+        self.to_landmark = array('d')
+        for landmark in self.landmarks:
+            self.from_landmark.extend(forward.solve_all(landmark)[0])
+            self.to_landmark.extend(backward.solve_all(landmark)[0])
+
+
+    def select_landmarks(self, dijkstra, k):
+        # Farthest selection: the first landmark is the node farthest from node 0, every next one
+        # is the node farthest from its closest landmark. Nodes no landmark reaches are only
+        # picked once every reachable node is a landmark.
+        closest = list(dijkstra.solve_all(0)[0])
+        landmarks = []
+        while len(landmarks) < k:
+            candidates = [node for node in range(self.n) if node not in landmarks]
+            reachable = [node for node in candidates if closest[node] != math.inf]
+            if reachable:
+                landmark = max(reachable, key=lambda node: closest[node])
+            else:
+                landmark = candidates[0]
+            dist = dijkstra.solve_all(landmark)[0]
+            if landmarks:
+                closest = [min(a, b) for a, b in zip(closest, dist)]
+            else:
+                closest = list(dist)
+            landmarks.append(landmark)
+        return landmarks
+
+
+    def __call__(self, node, end):
+        # Returns the best lower bound of d(node, end) given by the landmarks, or math.inf if
+        # the landmarks prove that 'end' cannot be reached from 'node'.
+        n = self.n
+        best = 0
+        for i in range(len(self.landmarks)):
+            from_node, from_end = self.from_landmark[i * n + node], self.from_landmark[i * n + end]
+            to_node, to_end = self.to_landmark[i * n + node], self.to_landmark[i * n + end]
+            # L reaches 'node' but not 'end', or 'end' reaches L but 'node' does not.
+            if (from_node != math.inf and from_end == math.inf) or (to_end != math.inf and to_node == math.inf):
+                return math.inf
+            if from_node != math.inf and from_end - from_node > best:
+                best = from_end - from_node
+            if to_end != math.inf and to_node - to_end > best:
+                best = to_node - to_end
+        return best
+
+
+    def save(self, path):
+        # Header (magic, n, k) followed by the landmarks (int64) and both distance tables (float64).
+        if sys.byteorder != 'little':
+            raise OSError("The landmark file format requires a little-endian platform!")
+        with open(path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.n, len(self.landmarks)))
+            for section in (self.landmarks, self.from_landmark, self.to_landmark):
+                f.write(memoryview(section).cast('B'))
+
+
+    @classmethod
+    def load(cls, path):
+        # Opens a file written by save, memory-mapping the distance tables.
+        if sys.byteorder != 'little':
+            raise OSError("The landmark file format requires a little-endian platform!")
+        view = memoryview(map_file(path))
+        magic, n, k = cls.HEADER.unpack_from(view, 0)
+        if magic != cls.MAGIC:
+            raise ValueError("File is not a landmark file!")
+        if len(view) != cls.HEADER.size + 8 * k * (1 + 2 * n):
+            raise ValueError("File size does not match its header!")
+        heuristic = cls.__new__(cls)
+        heuristic.n = n
+        start = cls.HEADER.size
+        heuristic.landmarks = view[start:start + 8 * k].cast('q')
+        start += 8 * k
+        heuristic.from_landmark = view[start:start + 8 * k * n].cast('d')
+        start += 8 * k * n
+        heuristic.to_landmark = view[start:start + 8 * k * n].cast('d')
+        return heuristic
+
+
+if __name__ == "__main__":
+    # 4x4 grid with unit-length edges in both directions
+    side = 4
+    coordinates = [(i % side, i // side) for i in range(side * side)]
+    graph = AdjacencyList(side * side)
+    for i in range(side * side):
+        if i % side != side - 1:
+            graph.add_edge(i, i + 1, 1, directed=False)
+        if i + side < side * side:
+            graph.add_edge(i, i + side, 1, directed=False)
+
+    a_star = AStarAlgorithm(graph, euclidean_heuristic(coordinates))
+    print(a_star.reconstruct_path(0, 15))
+
+    alt = AStarAlgorithm(graph, LandmarkHeuristic(graph, landmarks=2))
+    print(alt.solve(0, 15), alt.heuristic.landmarks.tolist())
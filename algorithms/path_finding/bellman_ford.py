@@ -1,22 +1,38 @@
 from util.graph_structures import AdjacencyList, AdjacencyMatrix
+from collections import deque
 import math
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 class BellmanFordAlgorithm:
     """
     An implementation of the Bellman-Ford algorithm. The algorithm finds the shortest path betwen a
     starting node and all other nodes in the graph. The algorithm also detects negative cycles.
+    solve stops as soon as a pass over the edges relaxes nothing, solve_spfa only rescans the nodes
+    whose distance changed (queue-based variant, SPFA) and solve_vectorized runs every pass as a
+    few NumPy operations over flat edge arrays.
     Time Complexity: O(EV)
     Based on original code in Java from: https://github.com/williamfiset/Algorithms
     """
 
     def __init__(self, graph):
         if isinstance(graph, AdjacencyMatrix):
-            graph = AdjacencyList(graph)
+            graph = graph.to_adjacency_list()
         self.graph = graph
         n = len(graph)
         self.n = n
         # Maintain an array of the minimum distance to each node
         self.dist = [math.inf] * n
+        # (graph version, edge arrays) used by solve_vectorized
+        self.edge_arrays = None
+
+
+    def reset(self):
+        # Clears the distances of the previous solve. The edge arrays are kept.
+        self.dist = [math.inf] * self.n
 
 
     def solve(self, start):
@@ -24,31 +40,191 @@ class BellmanFordAlgorithm:
         # a starting node and all other nodes in the graph. The algorithm also detects negative cycles.
         # If a node is a part of a negative cycle then the minimum cost for that node is set to -math.inf.
         
-        self.__init__(self.graph)
+        self.reset()
         self.dist[start] = 0
 
-        # For each node, apply relaxation for all the edges
-        for node in range(0, self.n-1):
-            for node_from, edges in enumerate(self.graph):
-                for node_to, edge_cost in edges:
-                    new_dist = self.dist[node_from] + edge_cost
-                    if new_dist < self.dist[node_to]:
-                        self.dist[node_to] = new_dist
-
-        # Run algorithm a second time to detect which nodes are part
-        # of a negative cycle. A negative cycle has occurred if we
-        # can find a better path beyond the optimal solution.
-        for node in range(0, self.n-1):
-            for node_from, edges in enumerate(self.graph):
-                for node_to, edge_cost in edges:
-                    new_dist = self.dist[node_from] + edge_cost
-                    if new_dist < self.dist[node_to]:
-                        self.dist[node_to] = -math.inf
+        # For each node, apply relaxation for all the edges. Once a whole pass relaxes nothing the
+        # distances are final and there is no negative cycle reachable from the start node.
+        for _ in range(0, self.n-1):
+            if not self.relax_all():
+                return self.dist
+
+        # Any edge that can still be relaxed after n-1 passes leads out of a negative cycle (or a
+        # node reachable from one): every node reachable from its head has a cost of -math.inf.
+        sources = []
+        for node_from in range(self.n):
+            for node_to, edge_cost in self.graph[node_from]:
+                if self.dist[node_from] + edge_cost < self.dist[node_to]:
+                    sources.append(node_to)
+        self.propagate_negative_cycles(sources)
 
         # Return the array containing the shortest distance to every node
         return self.dist
 
 
+    def relax_all(self):
+        # Relaxes every edge of the graph once, returning whether any distance changed.
+        dist = self.dist
+        relaxed = False
+        for node_from in range(self.n):
+            if dist[node_from] == math.inf:
+                continue
+            for node_to, edge_cost in self.graph[node_from]:
+                new_dist = dist[node_from] + edge_cost
+                if new_dist < dist[node_to]:
+                    dist[node_to] = new_dist
+                    relaxed = True
+        return relaxed
+
+
+    def propagate_negative_cycles(self, sources):
+        # Sets the cost of every node reachable from 'sources' to -math.inf (breadth first search).
+        queue = deque()
+        for node in sources:
+            if self.dist[node] != -math.inf:
+                self.dist[node] = -math.inf
+                queue.append(node)
+        while queue:
+            node_from = queue.popleft()
+            for node_to, _ in self.graph[node_from]:
+                if self.dist[node_to] != -math.inf:
+                    self.dist[node_to] = -math.inf
+                    queue.append(node_to)
+
+
+    def solve_spfa(self, start):
+        # Queue-based Bellman-Ford (Shortest Path Faster Algorithm), giving the same result as solve.
+        # Only nodes whose distance changed are scanned again, and a node whose distance improves
+        # beyond the front of the queue is put first (small label first). A node is not scanned while
+        # its parent in the shortest path tree is waiting in the queue, since it will be improved
+        # again anyway. A node reached by a path of n edges proves a negative cycle: the cycle is
+        # found by walking back its parents and everything reachable from it is set to -math.inf.
+        # Time Complexity: O(EV) in the worst case, usually much closer to O(E)
+
+        self.reset()
+        n, dist = self.n, self.dist
+        dist[start] = 0
+        prev = [None] * n
+        # Number of edges on the path found to every node
+        length = [0] * n
+        in_queue = [False] * n
+        in_queue[start] = True
+        queue = deque([start])
+
+        while queue:
+            node_from = queue.popleft()
+            in_queue[node_from] = False
+            parent = prev[node_from]
+            if dist[node_from] == -math.inf or (parent is not None and in_queue[parent]):
+                continue
+
+            for node_to, edge_cost in self.graph[node_from]:
+                new_dist = dist[node_from] + edge_cost
+                if new_dist >= dist[node_to]:
+                    continue
+                dist[node_to] = new_dist
+                prev[node_to] = node_from
+                length[node_to] = length[node_from] + 1
+                if length[node_to] >= n:
+                    self.propagate_negative_cycles(self.find_cycle(prev, node_to))
+                    if dist[node_from] == -math.inf:
+                        break
+                elif not in_queue[node_to]:
+                    in_queue[node_to] = True
+                    if queue and new_dist < dist[queue[0]]:
+                        queue.appendleft(node_to)
+                    else:
+                        queue.append(node_to)
+
+        return dist
+
+
+    def find_cycle(self, prev, node):
+        # Walks back the parents of 'node' and returns the nodes of the cycle found. If the walk
+        # reaches the start node instead (parents changed since 'node' was reached), 'node' itself
+        # is returned, which a negative cycle still reaches.
+        seen = set()
+        at = node
+        while at is not None and at not in seen:
+            seen.add(at)
+            at = prev[at]
+        if at is None:
+            return [node]
+        cycle = [at]
+        node = prev[at]
+        while node != at:
+            cycle.append(node)
+            node = prev[node]
+        return cycle
+
+
+    def solve_vectorized(self, start):
+        # Same result as solve, but each pass relaxes all the edges at once with NumPy: the edges
+        # are flattened into src/dst/weight arrays sorted by dst, the candidate distances of a pass
+        # are dist[src] + weight and their minimum per destination node is taken with
+        # np.minimum.reduceat. Passes stop once nothing improves; if the n-th pass still improves
+        # some nodes, -math.inf is spread from them one BFS level at a time.
+        if np is None:
+            raise ImportError("NumPy is required to run the vectorized Bellman-Ford!")
+        self.reset()
+        src, dst, weights, targets, starts, integer = self.get_edge_arrays()
+        dist = np.full(self.n, math.inf)
+        dist[start] = 0
+
+        improved = None
+        if len(src):
+            for _ in range(self.n):
+                best = np.minimum.reduceat(dist[src] + weights, starts)
+                improved = best < dist[targets]
+                if not improved.any():
+                    improved = None
+                    break
+                dist[targets[improved]] = best[improved]
+
+        if improved is not None:
+            # Nodes still improving after n passes are reached by a negative cycle
+            cycle = np.zeros(self.n, dtype=bool)
+            frontier = targets[improved]
+            while len(frontier):
+                cycle[frontier] = True
+                reached = dst[cycle[src]]
+                frontier = np.unique(reached[~cycle[reached]])
+            dist[cycle] = -math.inf
+
+        self.dist = dist.tolist()
+        if integer:
+            # Integer weights give integer distances, as in solve
+            self.dist = [int(value) if math.isfinite(value) else value for value in self.dist]
+        return self.dist
+
+
+    def get_edge_arrays(self):
+        # Flattens the edges into (src, dst, weights) arrays sorted by dst, plus the distinct dst
+        # nodes, where their edges start and whether all weights are integers. The arrays are
+        # rebuilt only when the graph changes.
+        version = getattr(self.graph, 'version', 0)
+        if self.edge_arrays is not None and self.edge_arrays[0] == version:
+            return self.edge_arrays[1]
+        if hasattr(self.graph, 'offsets'):
+            # CompressedSparseRow
+            offsets = np.asarray(self.graph.offsets)
+            src = np.repeat(np.arange(self.n), np.diff(offsets))
+            dst = np.asarray(self.graph.targets, dtype=np.int64)
+            weights = np.asarray(self.graph.weights)
+        else:
+            edges = [(node_from, node_to, edge_cost) for node_from in range(self.n)
+                     for node_to, edge_cost in self.graph[node_from]]
+            src = np.array([edge[0] for edge in edges], dtype=np.int64)
+            dst = np.array([edge[1] for edge in edges], dtype=np.int64)
+            weights = np.array([edge[2] for edge in edges])
+        integer = weights.dtype.kind in 'iub' or not len(weights)
+        order = np.argsort(dst, kind='stable')
+        src, dst, weights = src[order], dst[order], weights[order].astype(np.float64)
+        targets, starts = np.unique(dst, return_index=True)
+        self.edge_arrays = (version, (src, dst, weights, targets, starts, integer))
+        return self.edge_arrays[1]
+
+
 if __name__ == "__main__":
     graph = AdjacencyList(9)
     graph.add_edge(0, 1, 1)
@@ -63,4 +239,7 @@ if __name__ == "__main__":
     graph.add_edge(5, 7, 3)
 
     bf = BellmanFordAlgorithm(graph)
-    print(bf.solve(start=0))
\ No newline at end of file
+    print(bf.solve(start=0))
+    print(bf.solve_spfa(start=0))
+    if np is not None:
+        print(bf.solve_vectorized(start=0))
\ No newline at end of file
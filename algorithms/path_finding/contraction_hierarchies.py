@@ -0,0 +1,370 @@
+from util.graph_structures import AdjacencyList, AdjacencyMatrix, CompressedSparseRow
+from util.graph_io import map_file
+from heapq import heappush, heappop, heapify
+from array import array
+import math
+import struct
+import sys
+
+class ContractionHierarchyAlgorithm:
+    """
+    Contraction Hierarchies (CH) answer shortest path queries on a static graph much faster than
+    Dijkstra by preprocessing it once.
+    Preprocessing contracts the nodes one by one in order of importance: removing a node 'v' adds
+    a shortcut u -> x for every pair of neighbors u -> v -> x unless a witness search finds a path
+    from u to x that avoids v and is at least as short. Nodes are ordered with a lazily updated
+    priority queue keyed on the edge difference (shortcuts added - edges removed + contracted
+    neighbors). Every edge ends up stored at its lower ranked endpoint: in the upward graph if it
+    leads to a higher ranked node, in the downward graph (reversed) otherwise.
+    A query is a bidirectional Dijkstra that only climbs: forward in the upward graph from the
+    start node and backward in the downward graph from the end node. Shortcuts remember the
+    contracted node they bypass so paths are unpacked back to original edges.
+    The hierarchy can be saved to a binary file and memory-mapped back.
+    Edge weights must be non-negative.
+    Preprocessing: depends on the graph, usually close to linear on road-like networks.
+    Query: a few hundred settled nodes on road-like networks instead of a large part of the graph.
+    """
+
+    MAGIC = b'GTCH01'
+    HEADER = struct.Struct('<6scxQQQ')
+
+    def __init__(self, graph, max_settled=500):
+        if isinstance(graph, AdjacencyMatrix):
+            graph = graph.to_adjacency_list()
+        self.graph = graph
+        n = len(graph)
+        self.n = n
+        # Maximum number of nodes settled by a witness search. Smaller limits preprocess faster
+        # but may add unnecessary shortcuts; they never make the results incorrect.
+        self.max_settled = max_settled
+        # rank[v] is the position of v in the contraction order
+        self.rank = None
+        self.upward = None
+        self.downward = None
+        # Node bypassed by each edge of the upward/downward graphs (-1 for original edges)
+        self.upward_middle = None
+        self.downward_middle = None
+        self.preprocessed = False
+
+
+    def preprocess(self):
+        # Contracts every node and builds the upward and downward graphs.
+        if self.preprocessed:
+            return None
+        n = self.n
+
+        # Remaining graph: out_edges[u][x] = in_edges[x][u] = (weight, middle). Only the
+        # cheapest of parallel edges is kept and self loops are dropped.
+        self.out_edges = [{} for _ in range(n)]
+        self.in_edges = [{} for _ in range(n)]
+        for from_node in range(n):
+            for to_node, weight in self.graph[from_node]:
+                if to_node != from_node and weight < self.out_edges[from_node].get(to_node, (math.inf,))[0]:
+                    self.out_edges[from_node][to_node] = (weight, -1)
+                    self.in_edges[to_node][from_node] = (weight, -1)
+        self.contracted_neighbors = [0] * n
+
+        rank = array('q', [-1]) * n
+        upward = [[] for _ in range(n)]
+        downward = [[] for _ in range(n)]
+
+        # Lazy updates: the priority of the popped node is recomputed and the node is pushed back
+        # if it is no longer the minimum.
+        pq = [(self.edge_difference(v, self.find_shortcuts(v)), v) for v in range(n)]
+        heapify(pq)
+        order = 0
+        while pq:
+            _, v = heappop(pq)
+            shortcuts = self.find_shortcuts(v)
+            priority = self.edge_difference(v, shortcuts)
+            if pq and priority > pq[0][0]:
+                heappush(pq, (priority, v))
+                continue
+            self.contract(v, shortcuts, upward, downward)
+            rank[v] = order
+            order += 1
+
+        del self.out_edges, self.in_edges, self.contracted_neighbors
+        self.rank = rank
+        self.upward, self.upward_middle = self.build_graph(upward)
+        self.downward, self.downward_middle = self.build_graph(downward)
+        self.setup_workspace()
+        self.preprocessed = True
+        return None
+
+
+    def edge_difference(self, v, shortcuts):
+        return len(shortcuts) - len(self.in_edges[v]) - len(self.out_edges[v]) + self.contracted_neighbors[v]
+
+
+    def find_shortcuts(self, v):
+        # Returns the (u, x, weight) shortcuts needed to preserve shortest paths when removing v.
+        shortcuts = []
+        outgoing = [(x, weight) for x, (weight, _) in self.out_edges[v].items()]
+        if not outgoing:
+            return shortcuts
+        for u, (weight_uv, _) in self.in_edges[v].items():
+            targets = {x: weight_uv + weight_vx for x, weight_vx in outgoing if x != u}
+            if not targets:
+                continue
+            dist = self.witness_search(u, v, max(targets.values()), targets)
+            for x, cost in targets.items():
+                if dist.get(x, math.inf) > cost:
+                    shortcuts.append((u, x, cost))
+        return shortcuts
+
+
+    def witness_search(self, source, excluded, limit, targets):
+        # Dijkstra from 'source' in the remaining graph without the node 'excluded'. It stops once
+        # the distances exceed 'limit', every target is settled, or max_settled nodes are settled.
+        # Returned distances are lengths of actual paths, possibly not the shortest ones.
+        dist = {source: 0}
+        pq = [(0, source)]
+        remaining = len(targets)
+        settled = 0
+        while pq:
+            node_val, node_from = heappop(pq)
+            if node_val > dist[node_from]:
+                continue
+            if node_val > limit:
+                break
+            if node_from in targets:
+                remaining -= 1
+                if remaining == 0:
+                    break
+            settled += 1
+            if settled > self.max_settled:
+                break
+            for node_to, (weight, _) in self.out_edges[node_from].items():
+                if node_to == excluded:
+                    continue
+                new_dist = node_val + weight
+                if new_dist < dist.get(node_to, math.inf):
+                    dist[node_to] = new_dist
+                    heappush(pq, (new_dist, node_to))
+        return dist
+
+
+    def contract(self, v, shortcuts, upward, downward):
+        # Adds the shortcuts, then moves the remaining edges of v (which all lead to higher ranked
+        # nodes) to the upward/downward graphs and removes v from the remaining graph.
+        for u, x, weight in shortcuts:
+            if weight < self.out_edges[u].get(x, (math.inf,))[0]:
+                self.out_edges[u][x] = (weight, v)
+                self.in_edges[x][u] = (weight, v)
+        for x, (weight, middle) in self.out_edges[v].items():
+            upward[v].append((x, weight, middle))
+            del self.in_edges[x][v]
+            self.contracted_neighbors[x] += 1
+        for u, (weight, middle) in self.in_edges[v].items():
+            downward[v].append((u, weight, middle))
+            del self.out_edges[u][v]
+            self.contracted_neighbors[u] += 1
+        self.out_edges[v] = {}
+        self.in_edges[v] = {}
+
+
+    def build_graph(self, edges):
+        # Packs per node (node, weight, middle) lists into a CompressedSparseRow and a middle array.
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = []
+        middles = array('q')
+        for node_edges in edges:
+            for to_node, weight, middle in node_edges:
+                targets.append(to_node)
+                weights.append(weight)
+                middles.append(middle)
+            offsets.append(len(targets))
+        return CompressedSparseRow.from_arrays(offsets, targets, CompressedSparseRow.pack_weights(weights)), middles
+
+
+    def setup_workspace(self):
+        # Query arrays, allocated once and reset through the 'touched' lists.
+        n = self.n
+        self.dist = ([math.inf] * n, [math.inf] * n)
+        # Node and edge index through which each node was reached
+        self.prev = ([None] * n, [None] * n)
+        self.prev_edge = ([None] * n, [None] * n)
+        self.touched = ([], [])
+
+
+    def reset(self):
+        for side in (0, 1):
+            dist, prev, prev_edge = self.dist[side], self.prev[side], self.prev_edge[side]
+            for node in self.touched[side]:
+                dist[node] = math.inf
+                prev[node] = None
+                prev_edge[node] = None
+            self.touched[side].clear()
+
+
+    def solve(self, start, end):
+        # Returns the shortest distance from 'start' to 'end', or math.inf if 'end' is unreachable.
+        self.preprocess()
+        self.meeting_node = None
+        self.reset()
+        for side, node in ((0, start), (1, end)):
+            self.dist[side][node] = 0
+            self.touched[side].append(node)
+        graphs = (self.upward, self.downward)
+        queues = ([(0, start)], [(0, end)])
+        best = math.inf
+        meeting_node = None
+
+        # Each search goes on while its queue minimum is below the best distance found so far.
+        while (queues[0] and queues[0][0][0] < best) or (queues[1] and queues[1][0][0] < best):
+            if queues[0] and queues[0][0][0] < best and (not queues[1] or queues[1][0][0] >= best or queues[0][0][0] <= queues[1][0][0]):
+                side = 0
+            else:
+                side = 1
+            dist, prev, prev_edge, touched = self.dist[side], self.prev[side], self.prev_edge[side], self.touched[side]
+            node_val, node_from = heappop(queues[side])
+            if node_val > dist[node_from]:
+                continue
+
+            # Both searches met at this node
+            total = node_val + self.dist[1 - side][node_from]
+            if total < best:
+                best = total
+                meeting_node = node_from
+
+            graph = graphs[side]
+            targets, weights = graph.targets, graph.weights
+            for i in range(graph.offsets[node_from], graph.offsets[node_from + 1]):
+                node_to = targets[i]
+                new_dist = node_val + weights[i]
+                if new_dist < dist[node_to]:
+                    if dist[node_to] == math.inf:
+                        touched.append(node_to)
+                    dist[node_to] = new_dist
+                    prev[node_to] = node_from
+                    prev_edge[node_to] = i
+                    heappush(queues[side], (new_dist, node_to))
+
+        self.meeting_node = meeting_node
+        return best
+
+
+    def reconstruct_path(self, start, end):
+        # Reconstructs the shortest path (of nodes) from 'start' to 'end' inclusive, unpacking every
+        # shortcut. If 'start' and 'end' are not connected then an empty array is returned.
+        if end < 0 or end >= self.n:
+            raise ValueError("Invalid node index")
+        if start < 0 or start >= self.n:
+            raise ValueError("Invalid node index")
+        if self.solve(start, end) == math.inf:
+            return []
+
+        # Edges (from, to, middle) of the path in the hierarchy
+        edges = []
+        at = self.meeting_node
+        while self.prev[0][at] is not None:
+            edges.append((self.prev[0][at], at, self.upward_middle[self.prev_edge[0][at]]))
+            at = self.prev[0][at]
+        edges.reverse()
+        at = self.meeting_node
+        while self.prev[1][at] is not None:
+            edges.append((at, self.prev[1][at], self.downward_middle[self.prev_edge[1][at]]))
+            at = self.prev[1][at]
+
+        path = [start]
+        for edge in edges:
+            self.unpack_edge(edge, path)
+        return path
+
+
+    def unpack_edge(self, edge, path):
+        # Appends the nodes of 'edge' after its first node to 'path', replacing every shortcut
+        # u -> x bypassing m by u -> m -> x until only original edges remain.
+        stack = [edge]
+        while stack:
+            from_node, to_node, middle = stack.pop()
+            if middle == -1:
+                path.append(to_node)
+            else:
+                stack.append((middle, to_node, self.edge_middle(middle, to_node)))
+                stack.append((from_node, middle, self.edge_middle(from_node, middle)))
+
+
+    def edge_middle(self, from_node, to_node):
+        # Returns the middle node of the hierarchy edge from_node -> to_node, which is stored at
+        # its lower ranked endpoint.
+        if self.rank[from_node] < self.rank[to_node]:
+            graph, middles, node, other = self.upward, self.upward_middle, from_node, to_node
+        else:
+            graph, middles, node, other = self.downward, self.downward_middle, to_node, from_node
+        for i in range(graph.offsets[node], graph.offsets[node + 1]):
+            if graph.targets[i] == other:
+                return middles[i]
+        raise ValueError("Edge not found in the hierarchy!")
+
+
+    def save(self, path):
+        # Header (magic, weight typecode, n, upward and downward edge counts) followed by the ranks
+        # and, for the upward then the downward graph, its offsets, targets, weights and middles.
+        if sys.byteorder != 'little':
+            raise OSError("The hierarchy file format requires a little-endian platform!")
+        self.preprocess()
+        # Both graphs are written with the same weight type
+        typecode = 'q' if memoryview(self.upward.weights).format == memoryview(self.downward.weights).format == 'q' else 'd'
+        with open(path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, typecode.encode(), self.n, self.upward.m, self.downward.m))
+            f.write(memoryview(self.rank).cast('B'))
+            for graph, middles in ((self.upward, self.upward_middle), (self.downward, self.downward_middle)):
+                weights = graph.weights if memoryview(graph.weights).format == typecode else array(typecode, graph.weights)
+                for section in (graph.offsets, graph.targets, weights, middles):
+                    f.write(memoryview(section).cast('B'))
+
+
+    @classmethod
+    def load(cls, path):
+        # Opens a hierarchy written by save, memory-mapping its arrays. The returned instance can
+        # answer queries but has no original graph.
+        if sys.byteorder != 'little':
+            raise OSError("The hierarchy file format requires a little-endian platform!")
+        view = memoryview(map_file(path))
+        magic, typecode, n, m_up, m_down = cls.HEADER.unpack_from(view, 0)
+        if magic != cls.MAGIC:
+            raise ValueError("File is not a contraction hierarchy!")
+        typecode = typecode.decode()
+        if len(view) != cls.HEADER.size + 8 * (n + 2 * (n + 1) + 3 * m_up + 3 * m_down):
+            raise ValueError("File size does not match its header!")
+
+        ch = cls.__new__(cls)
+        ch.graph = None
+        ch.n = n
+        start = cls.HEADER.size
+
+        def take(count, code):
+            nonlocal start
+            section = view[start:start + 8 * count].cast(code)
+            start += 8 * count
+            return section
+
+        ch.rank = take(n, 'q')
+        graphs = []
+        for m in (m_up, m_down):
+            offsets, targets, weights, middles = take(n + 1, 'q'), take(m, 'q'), take(m, typecode), take(m, 'q')
+            graphs.append((CompressedSparseRow.from_arrays(offsets, targets, weights), middles))
+        (ch.upward, ch.upward_middle), (ch.downward, ch.downward_middle) = graphs
+        ch.setup_workspace()
+        ch.preprocessed = True
+        return ch
+
+
+if __name__ == "__main__":
+    graph = AdjacencyList(8)
+    graph.add_edge(0, 1, 2, directed=False)
+    graph.add_edge(1, 2, 2, directed=False)
+    graph.add_edge(2, 3, 2, directed=False)
+    graph.add_edge(3, 4, 2, directed=False)
+    graph.add_edge(0, 5, 3, directed=False)
+    graph.add_edge(5, 6, 3, directed=False)
+    graph.add_edge(6, 4, 3, directed=False)
+    graph.add_edge(2, 7, 1, directed=False)
+    graph.add_edge(7, 6, 1, directed=False)
+
+    ch = ContractionHierarchyAlgorithm(graph)
+    print(ch.solve(0, 4))
+    print(ch.reconstruct_path(0, 4))
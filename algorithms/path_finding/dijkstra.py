@@ -1,5 +1,5 @@
 from util.graph_structures import AdjacencyList, AdjacencyMatrix
-from util.data_structures import IndexedPriorityQueue
+from util.data_structures import IndexedPriorityQueue, BucketQueue, RadixHeap
 from heapq import heappush, heappop
 import math
 
@@ -10,14 +10,38 @@ class DijkstraAlgorithm:
     node and all other nodes in the graph. However, in this implementation since we're only going
     from a starting node to an ending node we can employ an optimization to stop early once we've
     visited all the neighbors of the ending node.
+    The visited/prev/dist arrays are allocated once and reused across queries: each query only
+    resets the entries touched by the previous one. solve_all answers one-to-all queries and
+    solve_targets stops once a set of targets has been settled. solve_bidirectional searches from
+    both ends at once, using the reversed graph for the backward search.
+    solve_eager uses an indexed d-ary heap with decrease-key, so the queue never holds more than V
+    entries. On graphs with small non-negative integer weights it can use Dial's bucket queue
+    (O(E + V*C) for a maximum weight C) or a radix heap instead, see the 'queue' argument.
     Time Complexity: O((E + V)log(V)) when using a binary heap priority queue
     Based on original code in Java from: https://github.com/williamfiset/Algorithms
     """
 
-    def __init__(self, graph):
+    # Largest edge weight for which 'auto' picks the bucket queue over the radix heap. The weight
+    # must also not exceed the number of nodes: popping scans up to C empty buckets, which would
+    # outweigh the gain of the bucket queue on small graphs or short searches.
+    MAX_BUCKET_WEIGHT = 1 << 12
+
+    def __init__(self, graph, arity=2, queue='auto'):
+        # 'queue' selects the priority queue of solve_eager: 'heap' (indexed d-ary heap of the
+        # given arity), 'dial' (bucket queue), 'radix' (radix heap) or 'auto', which picks 'dial'
+        # or 'radix' when all weights are non-negative integers and 'heap' otherwise.
         if isinstance(graph, AdjacencyMatrix):
-            graph = AdjacencyList(graph)
+            graph = graph.to_adjacency_list()
+        if queue not in ('auto', 'heap', 'dial', 'radix'):
+            raise ValueError(f"Unknown queue type {queue!r}")
         self.graph = graph
+        # Arity of the indexed heap used by solve_eager
+        self.arity = arity
+        self.queue = queue
+        # (graph version, queue type, maximum weight) of the last weight scan
+        self.queue_choice = None
+        # Bucket queue of solve_eager, reused by every query on the same graph version
+        self.bucket_queue = None
         n = len(graph)
         self.n = n
         # Array used to track which nodes have already been visited.
@@ -25,6 +49,40 @@ class DijkstraAlgorithm:
         self.prev = [None] * n
         # Maintain an array of the minimum distance to each node
         self.dist = [math.inf] * n
+        # Nodes whose entries were modified by the last query
+        self.touched = []
+        # Workspace of the backward search of solve_bidirectional, allocated on first use.
+        # 'next' is the successor of each node on its shortest path to the end node.
+        self.visited_backward = None
+        self.next = None
+        self.dist_backward = None
+        self.touched_backward = []
+
+
+    def refresh(self, graph):
+        # Points the algorithm to the current state of 'graph' (e.g. after it was mutated),
+        # converting a matrix again. The number of nodes must not change.
+        if isinstance(graph, AdjacencyMatrix):
+            graph = graph.to_adjacency_list()
+        if len(graph) != self.n:
+            raise ValueError("The graph must keep the same number of nodes!")
+        self.graph = graph
+        self.queue_choice = None
+
+
+    def reset(self):
+        # Restores the arrays to their initial state, touching only the nodes reached by the
+        # previous query instead of reallocating them.
+        for node in self.touched:
+            self.visited[node] = False
+            self.prev[node] = None
+            self.dist[node] = math.inf
+        self.touched.clear()
+        for node in self.touched_backward:
+            self.visited_backward[node] = False
+            self.next[node] = None
+            self.dist_backward[node] = math.inf
+        self.touched_backward.clear()
 
 
     def solve_lazy(self, start, end):
@@ -32,8 +90,9 @@ class DijkstraAlgorithm:
         # from a starting node to an ending node. If there is no path between the
         # starting node and the destination node the returned value is set to be math.inf
         
-        self.__init__(self.graph)
+        self.reset()
         self.dist[start] = 0
+        self.touched.append(start)
         # Keep a priority queue of the next most promising node to visit.
         pq = []
         heappush(pq, (0, start))
@@ -61,6 +120,8 @@ class DijkstraAlgorithm:
                 # Relax edge by updating minimum cost if applicable.
                 new_dist = self.dist[node_from] + edge_cost
                 if new_dist < self.dist[node_to]:
+                    if self.dist[node_to] == math.inf:
+                        self.touched.append(node_to)
                     self.prev[node_to] = node_from
                     self.dist[node_to] = new_dist
                     heappush(pq, (self.dist[node_to], node_to))
@@ -80,11 +141,12 @@ class DijkstraAlgorithm:
         # from a starting node to an ending node. If there is no path between the
         # starting node and the destination node the returned value is set to be math.inf
 
-        self.__init__(self.graph)
+        self.reset()
         self.dist[start] = 0
+        self.touched.append(start)
 
         # Keep an Indexed Priority Queue (ipq) of the next most promising node to visit.
-        ipq = IndexedPriorityQueue()
+        ipq = self.make_queue()
         ipq.push(start, 0)
 
         while not ipq.is_empty():
@@ -110,6 +172,8 @@ class DijkstraAlgorithm:
                 # Relax edge by updating minimum cost if applicable.
                 new_dist = self.dist[node_from] + edge_cost
                 if new_dist < self.dist[node_to]:
+                    if self.dist[node_to] == math.inf:
+                        self.touched.append(node_to)
                     self.prev[node_to] = node_from
                     self.dist[node_to] = new_dist
                     ipq.push(node_to, self.dist[node_to])
@@ -125,7 +189,207 @@ class DijkstraAlgorithm:
         return math.inf
     
 
-    def reconstruct_path(self, start, end, lazy=False):
+    def make_queue(self):
+        # Builds the priority queue used by solve_eager. The edge weights are scanned once per
+        # graph version to choose the queue and the size of the bucket queue. The bucket queue is
+        # only allocated once per version, later queries clear and reuse it.
+        version = getattr(self.graph, 'version', 0)
+        if self.queue_choice is None or self.queue_choice[0] != version:
+            queue, max_weight = self.queue, self.max_integer_weight()
+            if queue == 'auto':
+                if max_weight is None:
+                    queue = 'heap'
+                elif max_weight <= min(self.MAX_BUCKET_WEIGHT, self.n):
+                    queue = 'dial'
+                else:
+                    queue = 'radix'
+            elif queue in ('dial', 'radix') and max_weight is None:
+                raise ValueError("Bucket queues and radix heaps require non-negative integer weights")
+            self.queue_choice = (version, queue, max_weight)
+            self.bucket_queue = BucketQueue(max_weight) if queue == 'dial' else None
+
+        queue = self.queue_choice[1]
+        if queue == 'dial':
+            self.bucket_queue.clear()
+            return self.bucket_queue
+        if queue == 'radix':
+            return RadixHeap()
+        return IndexedPriorityQueue(self.arity)
+
+
+    def max_integer_weight(self):
+        # Returns the largest edge weight if every weight is a non-negative integer, None otherwise.
+        weights = getattr(self.graph, 'weights', None)
+        if weights is not None:
+            # CompressedSparseRow: integer weights are stored as int64
+            if memoryview(weights).format not in ('q', 'l') or (len(weights) and min(weights) < 0):
+                return None
+            return int(max(weights)) if len(weights) else 0
+        max_weight = 0
+        for node in range(self.n):
+            for _, edge_cost in self.graph[node]:
+                if type(edge_cost) is not int or edge_cost < 0:
+                    return None
+                if edge_cost > max_weight:
+                    max_weight = edge_cost
+        return max_weight
+
+
+    def solve_all(self, start):
+        # Run Dijkstra's algorithm from 'start' until every reachable node is settled and return
+        # the 'dist' and 'prev' arrays. They are the algorithm's workspace, so they are only valid
+        # until the next query (copy them to keep them).
+        self.search(start, None)
+        return self.dist, self.prev
+
+
+    def solve_targets(self, start, targets):
+        # Run Dijkstra's algorithm from 'start' and return the distances to each node in 'targets'
+        # (math.inf for the unreachable ones). The search stops as soon as all targets are settled.
+        self.search(start, set(targets))
+        return [self.dist[target] for target in targets]
+
+
+    def search(self, start, targets):
+        # Lazy Dijkstra from 'start' that settles nodes until the queue is empty or, if 'targets'
+        # is a set, until all of its nodes have been settled.
+        self.reset()
+        self.dist[start] = 0
+        self.touched.append(start)
+        remaining = len(targets) if targets is not None else -1
+        if remaining == 0:
+            return None
+        pq = [(0, start)]
+
+        while pq:
+            node_val, node_from = heappop(pq)
+
+            # We already visited this node and can ignore it
+            if self.visited[node_from]:
+                continue
+            self.visited[node_from] = True
+
+            for node_to, edge_cost in self.graph[node_from]:
+                if self.visited[node_to]:
+                    continue
+
+                # Relax edge by updating minimum cost if applicable.
+                new_dist = node_val + edge_cost
+                if new_dist < self.dist[node_to]:
+                    if self.dist[node_to] == math.inf:
+                        self.touched.append(node_to)
+                    self.prev[node_to] = node_from
+                    self.dist[node_to] = new_dist
+                    heappush(pq, (new_dist, node_to))
+
+            # Stop once every target has been settled.
+            if targets is not None and node_from in targets:
+                remaining -= 1
+                if remaining == 0:
+                    return None
+        return None
+
+
+    def solve_bidirectional(self, start, end):
+        # Run Dijkstra's algorithm simultaneously forward from 'start' and backward from 'end' (on
+        # the reversed graph), always expanding the side with the smaller tentative distance. 'mu'
+        # holds the best start->end distance seen through any edge joining both searches and the
+        # search stops once the two queue minimums add up to at least 'mu'. If there is no path
+        # between the starting node and the destination node the returned value is math.inf
+        reverse = self.graph.to_reversed()
+        if self.next is None:
+            self.visited_backward = [False] * self.n
+            self.next = [None] * self.n
+            self.dist_backward = [math.inf] * self.n
+
+        self.reset()
+        self.dist[start] = 0
+        self.touched.append(start)
+        self.dist_backward[end] = 0
+        self.touched_backward.append(end)
+        if start == end:
+            return 0
+
+        mu = math.inf
+        meeting_node = None
+        sides = (
+            (self.graph, self.visited, self.prev, self.dist, self.touched, self.dist_backward),
+            (reverse, self.visited_backward, self.next, self.dist_backward, self.touched_backward, self.dist),
+        )
+        queues = ([(0, start)], [(0, end)])
+
+        while queues[0] and queues[1]:
+            if queues[0][0][0] + queues[1][0][0] >= mu:
+                break
+            side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+            graph, visited, links, dist, touched, other_dist = sides[side]
+            pq = queues[side]
+
+            node_val, node_from = heappop(pq)
+            if visited[node_from]:
+                continue
+            visited[node_from] = True
+
+            for node_to, edge_cost in graph[node_from]:
+                new_dist = node_val + edge_cost
+                # Relax edge by updating minimum cost if applicable.
+                if new_dist < dist[node_to]:
+                    if dist[node_to] == math.inf:
+                        touched.append(node_to)
+                    links[node_to] = node_from
+                    dist[node_to] = new_dist
+                    heappush(pq, (new_dist, node_to))
+                # The edge joins both searches: update the best path found so far.
+                if dist[node_to] + other_dist[node_to] < mu:
+                    mu = dist[node_to] + other_dist[node_to]
+                    meeting_node = node_to
+
+        if meeting_node is None:
+            return math.inf
+
+        # Stitch both halves together and store the path in 'prev' so path_to(end) can follow it.
+        path = self.path_to(meeting_node)
+        at = meeting_node
+        while at != end:
+            at = self.next[at]
+            path.append(at)
+        # With zero weight cycles both halves can share a node: drop the (zero cost) loop between
+        # its two occurrences.
+        stitched = []
+        position = {}
+        for node in path:
+            if node in position:
+                for removed in stitched[position[node] + 1:]:
+                    del position[removed]
+                del stitched[position[node] + 1:]
+            else:
+                position[node] = len(stitched)
+                stitched.append(node)
+        for i in range(1, len(stitched)):
+            node = stitched[i]
+            if self.dist[node] == math.inf:
+                self.touched.append(node)
+                self.dist[node] = mu - self.dist_backward[node]
+            self.prev[node] = stitched[i - 1]
+        self.dist[end] = mu
+        return mu
+
+
+    def path_to(self, end):
+        # Returns the path from the start of the last query to 'end' by following 'prev', or an
+        # empty list if 'end' was not reached.
+        path = []
+        if self.dist[end] == math.inf:
+            return path
+        at = end
+        while at is not None:
+            path.append(at)
+            at = self.prev[at]
+        path.reverse()
+        return path
+
+
+    def reconstruct_path(self, start, end, lazy=False, bidirectional=False):
         # Reconstructs the shortest path (of nodes) from 'start' to 'end' inclusive.
         # return an array of nodes indexes of the shortest path from 'start' to 'end'. If 'start' and
         # 'end' are not connected then an empty array is returned.
@@ -134,19 +398,15 @@ class DijkstraAlgorithm:
             raise ValueError("Invalid node index")
         if start < 0 or start >= self.n:
             raise ValueError("Invalid node index")
-        if lazy:
+        if bidirectional:
+            dist = self.solve_bidirectional(start, end)
+        elif lazy:
             dist = self.solve_lazy(start, end)
         else:
             dist = self.solve_eager(start, end)
-        path = []
         if dist == math.inf:
-            return path
-        at = end
-        while at is not None:
-            path.append(at)
-            at = self.prev[at]
-        path.reverse()
-        return path
+            return []
+        return self.path_to(end)
 
 
 if __name__ == "__main__":
@@ -159,4 +419,7 @@ if __name__ == "__main__":
     graph.add_edge(3, 4, 3)
 
     dijkstra = DijkstraAlgorithm(graph)
-    print(dijkstra.solve_lazy(start=0, end=4))
\ No newline at end of file
+    print(dijkstra.solve_lazy(start=0, end=4))
+    print(dijkstra.solve_all(start=0))
+    print(dijkstra.solve_targets(start=0, targets=[1, 3]))
+    print(dijkstra.reconstruct_path(start=0, end=4, bidirectional=True))
\ No newline at end of file
@@ -0,0 +1,94 @@
+from util.graph_structures import AdjacencyList, AdjacencyMatrix
+from util.graph_io import load_graph
+from algorithms.path_finding.dijkstra import DijkstraAlgorithm
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+import math
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Many-to-many shortest path distances: one Dijkstra run per source (stopping once every target
+# is settled), with the sources split in chunks across a pool of worker processes. Every worker
+# receives the graph once when it starts, or opens it itself when given the path of a binary graph
+# file (util.graph_io), in which case all workers share the same memory-mapped pages.
+# Time Complexity: O(S * (E + V)log(V)) spread over the workers
+
+# Per worker process state, set up by init_worker
+worker_dijkstra = None
+
+
+def init_worker(graph):
+    global worker_dijkstra
+    if isinstance(graph, (str, os.PathLike)):
+        graph = load_graph(graph)
+    worker_dijkstra = DijkstraAlgorithm(graph)
+
+
+def solve_chunk(sources, targets):
+    # Returns one row of distances to 'targets' for every node of 'sources'.
+    return [array('d', worker_dijkstra.solve_targets(source, targets)) for source in sources]
+
+
+def iterate_rows(graph, sources, targets, workers=None, chunk_size=None):
+    # Yields (source, row) pairs in the order of 'sources', where row[j] is the shortest distance
+    # from source to targets[j] (math.inf if unreachable). Rows are produced as soon as their chunk
+    # is done, so callers can stream them without holding the whole matrix.
+    sources = list(sources)
+    targets = list(targets)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(sources)))
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(len(sources) / (4 * workers)))
+    chunks = [sources[i:i + chunk_size] for i in range(0, len(sources), chunk_size)]
+
+    if workers == 1:
+        init_worker(graph)
+        results = (solve_chunk(chunk, targets) for chunk in chunks)
+        for chunk, rows in zip(chunks, results):
+            yield from zip(chunk, rows)
+        return None
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(graph,)) as executor:
+        results = executor.map(solve_chunk, chunks, [targets] * len(chunks))
+        for chunk, rows in zip(chunks, results):
+            yield from zip(chunk, rows)
+
+
+def distance_matrix(graph, sources, targets=None, workers=None, chunk_size=None):
+    # Returns the shortest path distances between every node of 'sources' and every node of
+    # 'targets' (default: the sources) as a 2-D float64 ndarray, or a list of array('d') rows
+    # without NumPy: matrix[i][j] is the distance from sources[i] to targets[j]. When sources and
+    # targets are the same the result can be passed straight to AdjacencyMatrix or TSPAlgorithm.
+    # 'graph' is any graph accepted by DijkstraAlgorithm or the path of a binary graph file.
+    if isinstance(graph, AdjacencyMatrix):
+        graph = graph.to_adjacency_list()
+    # Read once, since 'sources' may be an iterator and is also the default targets
+    sources = list(sources)
+    targets = sources if targets is None else list(targets)
+    rows = iterate_rows(graph, sources, targets, workers, chunk_size)
+    if np is None:
+        return [row for _, row in rows]
+    matrix = np.empty((len(sources), len(targets)))
+    for i, (_, row) in enumerate(rows):
+        matrix[i] = row
+    return matrix
+
+
+if __name__ == "__main__":
+    graph = AdjacencyList(6)
+    graph.add_edge(0, 1, 5, directed=False)
+    graph.add_edge(1, 2, 2, directed=False)
+    graph.add_edge(2, 3, 4, directed=False)
+    graph.add_edge(3, 4, 1, directed=False)
+    graph.add_edge(4, 0, 7, directed=False)
+    graph.add_edge(1, 5, 3, directed=False)
+
+    waypoints = [0, 2, 4, 5]
+    matrix = distance_matrix(graph, waypoints, workers=2)
+    print(matrix.tolist() if np is not None else [row.tolist() for row in matrix])
+    print(AdjacencyMatrix(matrix).graph)
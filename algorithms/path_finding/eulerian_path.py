@@ -12,7 +12,7 @@ class EulerianPathAlgorithm:
 
     def __init__(self, graph, start_node=0):
         if isinstance(graph, AdjacencyMatrix):
-            graph = AdjacencyList(graph)
+            graph = graph.to_adjacency_list()
         self.graph = graph
         n = len(graph)
         self.n = n
@@ -1,27 +1,66 @@
-from util.graph_structures import AdjacencyList, AdjacencyMatrix
+from util.graph_structures import AdjacencyList, AdjacencyMatrix, CompressedSparseRow
+from util.graph_io import map_file
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from array import array
 import math
+import os
+import struct
+import sys
+import tempfile
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class FloydWarshallAlgorithm:
     """
     This file contains an implementation of the Floyd-Warshall algorithm to find all pairs of
     shortest path between nodes in a graph. We also demonstrate how to detect negative cycle and
     reconstruct the shortest path.
+    When the input AdjacencyMatrix is stored as a NumPy ndarray (or vectorized=True is passed) each
+    k-iteration runs as a single broadcast operation over the whole matrix. In that mode 'dp' and
+    'next' are ndarrays and unreachable entries of 'next' hold UNREACHABLE instead of None.
+    solve_blocked runs the vectorized algorithm tile by tile (blocked Floyd-Warshall) so each tile
+    stays in cache, and relaxes the independent tiles of each phase on a pool of worker processes
+    sharing the matrices through shared memory.
+    A solved instance can be saved to a compact binary file (float32 or float64 distances, int32
+    successors) and loaded back memory-mapped in another process to reconstruct paths.
     Time Complexity: O(V^3)
     Based on original code in Java from: https://github.com/williamfiset/Algorithms
     """
 
-    def __init__(self, matrix):
-        if isinstance(matrix, AdjacencyList):
-            matrix = AdjacencyMatrix(matrix)
+    MAGIC = b'GTAPSP'
+    HEADER = struct.Struct('<6scxQ')
+
+    def __init__(self, matrix, vectorized=None):
+        if isinstance(matrix, (AdjacencyList, CompressedSparseRow)):
+            matrix = matrix.to_adjacency_matrix(dtype='float64' if vectorized else None)
         self.matrix = matrix
         n = len(matrix)
         self.n = n
-        # The memo table that will contain All Pairs Shortest Paths (APSP) through Dynamic Programming
-        self.dp = [[None] * n for _ in range(n)]
-        # Matrix used to reconstruct shortest paths
-        self.next = [[None] * n for _ in range(n)]
+        if vectorized is None:
+            vectorized = matrix.dtype is not None
+        if vectorized and np is None:
+            raise ImportError("NumPy is required to run the vectorized Floyd-Warshall!")
+        self.vectorized = vectorized
+        if vectorized:
+            # The memo table and the path reconstruction matrix as dense ndarrays
+            dtype = matrix.dtype if matrix.dtype is not None else 'float64'
+            self.dp = np.empty((n, n), dtype=dtype)
+            self.next = np.empty((n, n), dtype=np.int32)
+        else:
+            # The memo table that will contain All Pairs Shortest Paths (APSP) through Dynamic Programming
+            self.dp = [[None] * n for _ in range(n)]
+            # Matrix used to reconstruct shortest paths
+            self.next = [[None] * n for _ in range(n)]
         self.REACHES_NEGATIVE_CYCLE = -1
+        # Marks unreachable entries of 'next' in vectorized mode (None otherwise)
+        self.UNREACHABLE = -2
         self.solved = False
+        # Edge weights changed by update_edge, applied on top of the input matrix
+        self.overrides = {}
 
         # Setup step
         self.setup_step()
@@ -29,11 +68,28 @@ class FloydWarshallAlgorithm:
 
     def setup_step(self):
         # Copy input matrix and setupt 'next' matrix for path reconstruction.
-        for i in range(self.n):
-            for j in range(self.n):
-                if self.matrix.graph[i][j] != math.inf:
-                    self.next[i][j] = j
-                self.dp[i][j] = self.matrix.graph[i][j]
+        if self.vectorized:
+            if self.matrix.dtype is not None:
+                self.dp[:] = self.matrix.graph
+            else:
+                for i in range(self.n):
+                    self.dp[i] = self.matrix.row(i)
+            self.next[:] = np.where(self.dp != math.inf, np.arange(self.n, dtype=np.int32), self.UNREACHABLE)
+        else:
+            for i in range(self.n):
+                for j in range(self.n):
+                    self.next[i][j] = j if self.matrix.graph[i][j] != math.inf else None
+                    self.dp[i][j] = self.matrix.graph[i][j]
+        for (i, j), weight in self.overrides.items():
+            self.set_entry(i, j, weight)
+
+    def set_entry(self, i, j, weight):
+        # Sets dp[i][j] to the weight of the edge i -> j and next[i][j] accordingly.
+        self.dp[i][j] = weight
+        if weight != math.inf:
+            self.next[i][j] = j
+        else:
+            self.next[i][j] = self.UNREACHABLE if self.vectorized else None
 
     def solve(self):
         # As input, this class takes an adjacency matrix with edge weights between nodes, where
@@ -50,6 +106,8 @@ class FloydWarshallAlgorithm:
         # Runs Floyd-Warshall to compute the shortest distance between every pair of nodes.
         if self.solved:
             return None
+        if self.vectorized:
+            return self.vectorized_step()
         
         # Compute all pairs shortest paths.
         for k in range(self.n):
@@ -72,6 +130,81 @@ class FloydWarshallAlgorithm:
         self.solved = True
         return None
     
+    def vectorized_step(self):
+        # Runs Floyd-Warshall with each k-iteration computed for all (i, j) pairs at once.
+        dp, nxt = self.dp, self.next
+        via = np.empty_like(dp)
+        improved = np.empty(dp.shape, dtype=bool)
+
+        # Compute all pairs shortest paths.
+        for k in range(self.n):
+            np.add(dp[:, k, None], dp[None, k, :], out=via)
+            np.less(via, dp, out=improved)
+            np.copyto(dp, via, where=improved)
+            np.copyto(nxt, nxt[:, k, None].copy(), where=improved)
+
+        self.mark_negative_cycles()
+        self.solved = True
+        return None
+
+    def mark_negative_cycles(self):
+        # Identify negative cycles by propagating the value '-math.inf'
+        # to every edge that is part of or reaches into a negative cycle (vectorized mode).
+        dp, nxt = self.dp, self.next
+        for k in range(self.n):
+            if dp[k, k] < 0:
+                cells = np.ix_(dp[:, k] != math.inf, dp[k, :] != math.inf)
+                dp[cells] = -math.inf
+                nxt[cells] = self.REACHES_NEGATIVE_CYCLE
+
+    def solve_blocked(self, tile_size=256, workers=None):
+        # Blocked Floyd-Warshall: the matrix is split in tiles of tile_size x tile_size and, for
+        # each block of k values (phase), the diagonal tile is relaxed first, then the tiles of its
+        # row and column, then all the remaining tiles. The tiles of the last two steps only read
+        # tiles already finished in the phase, so they are spread across 'workers' processes
+        # (default: one per CPU) that update a shared memory copy of 'dp' and 'next'.
+        # Gives the same distances as the vectorized solve. Ties between equally short paths are
+        # broken towards fewer edges, so 'next' may pick another shortest path than the vectorized
+        # solve, but it never loops through a zero-weight cycle.
+        if not self.vectorized:
+            raise ValueError("The blocked Floyd-Warshall requires the vectorized mode!")
+        if self.solved:
+            return self.dp
+        if workers is None:
+            workers = os.cpu_count() or 1
+        blocks = math.ceil(self.n / tile_size)
+        # Number of edges of the path behind each entry of 'dp' (0 for the empty path of the diagonal)
+        hops = (self.dp != math.inf).astype(np.int32)
+        np.fill_diagonal(hops, self.dp.diagonal() != 0)
+
+        if workers == 1 or blocks <= 1:
+            for block in range(blocks):
+                for tiles in phase_tiles(block, blocks):
+                    relax_tiles(block, tiles, tile_size, (self.dp, self.next, hops))
+        else:
+            memory = shared_memory.SharedMemory(create=True, size=self.dp.nbytes + self.next.nbytes + hops.nbytes)
+            try:
+                dp, nxt, shared_hops = shared_arrays(memory, self.n, self.dp.dtype)
+                dp[:], nxt[:], shared_hops[:] = self.dp, self.next, hops
+                with ProcessPoolExecutor(max_workers=workers, initializer=init_tile_worker,
+                                         initargs=(memory.name, self.n, self.dp.dtype)) as executor:
+                    for block in range(blocks):
+                        diagonal, *steps = phase_tiles(block, blocks)
+                        relax_tiles(block, diagonal, tile_size, (dp, nxt, shared_hops))
+                        for tiles in steps:
+                            chunks = [tiles[i::workers] for i in range(min(workers, len(tiles)))]
+                            list(executor.map(relax_tiles, [block] * len(chunks), chunks,
+                                              [tile_size] * len(chunks)))
+                self.dp[:], self.next[:] = dp, nxt
+                del dp, nxt, shared_hops
+            finally:
+                memory.close()
+                memory.unlink()
+
+        self.mark_negative_cycles()
+        self.solved = True
+        return self.dp
+    
     def reconstruct_path(self, start, end):
         # Reconstructs the shortest path (of nodes) from 'start' to 'end' inclusive.
         # return an array of nodes indexes of the shortest path from 'start' to 'end'. If 'start' and
@@ -92,8 +225,10 @@ class FloydWarshallAlgorithm:
             # Return math.inf since there are an infinite number of shortest paths.
             if at == self.REACHES_NEGATIVE_CYCLE:
                 return math.inf
+            if len(path) == self.n:
+                raise RuntimeError("The path reconstruction matrix contains a cycle!")
             path.append(at)
-            at = self.next[at][end]
+            at = int(self.next[at][end])
         
         # Return math.inf since there are an infinite number of shortest paths.
         if self.next[at][end] == self.REACHES_NEGATIVE_CYCLE:
@@ -101,6 +236,178 @@ class FloydWarshallAlgorithm:
         path.append(end)
         return path
 
+    def update_edge(self, u, v, weight):
+        # Sets the weight of the edge u -> v (math.inf removes it) without changing the input matrix.
+        # On a solved instance a new or cheaper edge is taken into account in O(V^2): every pair
+        # (i, j) may now use the path i -> u -> v -> j. If the edge closes a negative cycle, every
+        # pair reaching u and reachable from v is marked as reaching a negative cycle instead. Any
+        # other change (a more expensive or removed edge) requires solving again from scratch.
+        if not (0 <= u < self.n and 0 <= v < self.n):
+            raise ValueError("Invalid node index")
+        if self.matrix is None:
+            raise ValueError("Results loaded from a file are read-only, they cannot be updated!")
+        old_weight = self.overrides.get((u, v), self.matrix[u, v])
+        self.overrides[(u, v)] = weight
+        if not self.solved:
+            self.set_entry(u, v, weight)
+            return None
+        if weight > old_weight:
+            self.solved = False
+            self.setup_step()
+            self.solve_step()
+            return None
+        if weight == old_weight:
+            return None
+
+        if self.vectorized:
+            dp, nxt = self.dp, self.next
+            # Pairs (i, j) with a path i -> u and a path v -> j
+            rows = np.flatnonzero(dp[:, u] != math.inf)
+            columns = np.flatnonzero(dp[v, :] != math.inf)
+            cells = np.ix_(rows, columns)
+            if weight + dp[v, u] < 0:
+                dp[cells] = -math.inf
+                nxt[cells] = self.REACHES_NEGATIVE_CYCLE
+                return None
+            via = dp[rows, u, None] + weight + dp[None, v, columns]
+            improved = via < dp[cells]
+            first = np.where(rows == u, v, nxt[rows, u])[:, None]
+            first = np.where(via == -math.inf, self.REACHES_NEGATIVE_CYCLE, first)
+            dp[cells] = np.where(improved, via, dp[cells])
+            nxt[cells] = np.where(improved, first, nxt[cells])
+            return None
+
+        rows = [i for i in range(self.n) if self.dp[i][u] != math.inf]
+        columns = [j for j in range(self.n) if self.dp[v][j] != math.inf]
+        if weight + self.dp[v][u] < 0:
+            for i in rows:
+                for j in columns:
+                    self.dp[i][j] = -math.inf
+                    self.next[i][j] = self.REACHES_NEGATIVE_CYCLE
+            return None
+        # Copies, since row u and column v may be improved as well
+        to_u = [self.dp[i][u] for i in range(self.n)]
+        from_v = list(self.dp[v])
+        for i in rows:
+            first = v if i == u else self.next[i][u]
+            for j in columns:
+                new_dist = to_u[i] + weight + from_v[j]
+                if new_dist < self.dp[i][j]:
+                    self.dp[i][j] = new_dist
+                    self.next[i][j] = first if new_dist != -math.inf else self.REACHES_NEGATIVE_CYCLE
+        return None
+
+    def save(self, path, dtype='float64'):
+        # Header (magic, distance typecode, n) followed by 'dp' as float32 ('f') or float64 ('d')
+        # values, padded to 8 bytes, and 'next' as int32 values where REACHES_NEGATIVE_CYCLE (-1)
+        # and UNREACHABLE (-2) mark the pairs without a path to follow. Both are stored row by row.
+        if sys.byteorder != 'little':
+            raise OSError("The APSP file format requires a little-endian platform!")
+        typecode = {'float32': 'f', 'float64': 'd'}.get(str(dtype))
+        if typecode is None:
+            raise ValueError("Distances can only be saved as float32 or float64!")
+        self.solve_step()
+        n = self.n
+        with open(path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, typecode.encode(), n))
+            if self.vectorized:
+                np.ascontiguousarray(self.dp, dtype=dtype).tofile(f)
+            else:
+                for row in self.dp:
+                    f.write(memoryview(array(typecode, row)).cast('B'))
+            f.write(bytes(-n * n * array(typecode).itemsize % 8))
+            if self.vectorized:
+                np.ascontiguousarray(self.next, dtype=np.int32).tofile(f)
+            else:
+                for row in self.next:
+                    f.write(memoryview(array('i', [self.UNREACHABLE if node is None else node for node in row])).cast('B'))
+
+
+    @classmethod
+    def load(cls, path):
+        # Opens a file written by save, memory-mapping 'dp' and 'next'. The returned instance is
+        # solved and read-only: it answers reconstruct_path but has no input matrix.
+        if sys.byteorder != 'little':
+            raise OSError("The APSP file format requires a little-endian platform!")
+        view = memoryview(map_file(path))
+        magic, typecode, n = cls.HEADER.unpack_from(view, 0)
+        if magic != cls.MAGIC:
+            raise ValueError("File is not an APSP file!")
+        typecode = typecode.decode()
+        itemsize = array(typecode).itemsize
+        dp_size = n * n * itemsize + (-n * n * itemsize % 8)
+        if len(view) != cls.HEADER.size + dp_size + 4 * n * n:
+            raise ValueError("File size does not match its header!")
+
+        fw = cls.__new__(cls)
+        fw.matrix = None
+        fw.n = n
+        fw.vectorized = False
+        fw.REACHES_NEGATIVE_CYCLE = -1
+        fw.UNREACHABLE = -2
+        fw.overrides = {}
+        fw.solved = True
+        start = cls.HEADER.size
+        dp = view[start:start + n * n * itemsize].cast(typecode)
+        nxt = view[start + dp_size:].cast('i')
+        # One memoryview per row, so dp[i][j] and next[i][j] work as on a solved instance
+        fw.dp = [dp[i * n:(i + 1) * n] for i in range(n)]
+        fw.next = [nxt[i * n:(i + 1) * n] for i in range(n)]
+        return fw
+
+
+# Per worker process state of solve_blocked, set up by init_tile_worker
+worker_memory = None
+worker_arrays = None
+
+# Hop counts of solve_blocked are capped there, so that the sum of two of them fits in an int32
+MAX_HOPS = 1 << 29
+
+
+def shared_arrays(memory, n, dtype):
+    # Returns the 'dp', 'next' and hop count ndarrays laid out one after the other in the shared memory.
+    dp = np.ndarray((n, n), dtype=dtype, buffer=memory.buf)
+    nxt = np.ndarray((n, n), dtype=np.int32, buffer=memory.buf, offset=dp.nbytes)
+    hops = np.ndarray((n, n), dtype=np.int32, buffer=memory.buf, offset=dp.nbytes + nxt.nbytes)
+    return dp, nxt, hops
+
+
+def init_tile_worker(name, n, dtype):
+    global worker_memory, worker_arrays
+    worker_memory = shared_memory.SharedMemory(name=name)
+    worker_arrays = shared_arrays(worker_memory, n, dtype)
+
+
+def phase_tiles(block, blocks):
+    # Returns the tiles (row block, column block) relaxed by a phase of the blocked algorithm, in
+    # three steps: the diagonal tile, its row and column, then all the other tiles.
+    others = [other for other in range(blocks) if other != block]
+    return ([(block, block)],
+            [(block, other) for other in others] + [(other, block) for other in others],
+            [(i, j) for i in others for j in others])
+
+
+def relax_tiles(block, tiles, tile_size, arrays=None):
+    # Relaxes every tile of 'tiles' through the nodes of the k 'block'.
+    # The tiles are not relaxed in the order of the plain algorithm, so with zero-weight cycles a
+    # strict comparison of the distances alone can leave a cycle in 'next'. Paths are compared by
+    # (distance, number of edges) instead: every step along 'next' then gets strictly closer to
+    # the destination.
+    dp, nxt, hops = arrays if arrays is not None else worker_arrays
+    ks = range(block * tile_size, min((block + 1) * tile_size, len(dp)))
+    for i, j in tiles:
+        rows = slice(i * tile_size, (i + 1) * tile_size)
+        columns = slice(j * tile_size, (j + 1) * tile_size)
+        tile, tile_next, tile_hops = dp[rows, columns], nxt[rows, columns], hops[rows, columns]
+        for k in ks:
+            via = dp[rows, k, None] + dp[None, k, columns]
+            # Capped so that the diverging paths around negative cycles cannot overflow
+            via_hops = np.minimum(hops[rows, k, None] + hops[None, k, columns], MAX_HOPS)
+            improved = (via < tile) | ((via == tile) & (via_hops < tile_hops) & (via != math.inf))
+            np.copyto(tile, via, where=improved)
+            np.copyto(tile_hops, via_hops, where=improved)
+            np.copyto(tile_next, nxt[rows, k, None].copy(), where=improved)
+
 
 if __name__ == "__main__":
     graph = AdjacencyMatrix(7)
@@ -115,4 +422,9 @@ if __name__ == "__main__":
     graph.add_edge(5, 4, -2)
 
     fw = FloydWarshallAlgorithm(graph)
-    print(fw.solve())
\ No newline at end of file
+    print(fw.solve())
+    fw.update_edge(0, 6, 3)
+    print(fw.reconstruct_path(0, 6))
+    path = os.path.join(tempfile.mkdtemp(), 'apsp.bin')
+    fw.save(path, dtype='float32')
+    print(FloydWarshallAlgorithm.load(path).reconstruct_path(0, 6))
\ No newline at end of file
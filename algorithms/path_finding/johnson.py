@@ -0,0 +1,157 @@
+from util.graph_structures import AdjacencyList, AdjacencyMatrix, CompressedSparseRow
+from util.graph_io import save_graph, load_graph, map_file
+from algorithms.path_finding.bellman_ford import BellmanFordAlgorithm
+from algorithms.path_finding.dijkstra import DijkstraAlgorithm
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+import tempfile
+import math
+import os
+
+# Per worker process state, set up by init_worker
+worker_dijkstra = None
+worker_potentials = None
+
+
+def init_worker(graph, potentials):
+    global worker_dijkstra, worker_potentials
+    if isinstance(graph, (str, os.PathLike)):
+        graph = load_graph(graph)
+    worker_dijkstra = DijkstraAlgorithm(graph)
+    worker_potentials = potentials
+
+
+def solve_chunk(sources):
+    # Returns the row of distances to every node for each node of 'sources', undoing the
+    # reweighting: d(u, v) = d'(u, v) - h(u) + h(v).
+    h = worker_potentials
+    rows = []
+    for source in sources:
+        dist, _ = worker_dijkstra.solve_all(source)
+        offset = h[source]
+        rows.append(array('d', [d - offset + h[node] if d != math.inf else math.inf
+                                for node, d in enumerate(dist)]))
+    return rows
+
+
+class JohnsonAlgorithm:
+    """
+    Johnson's algorithm finds the shortest paths between all pairs of nodes of a sparse graph that
+    may have negative edges (but no negative cycle). A virtual node linked to every node with
+    0-cost edges is added and Bellman-Ford from it gives a potential h(v) for every node. The edges
+    are then reweighted to w(u, v) + h(u) - h(v), which is never negative and keeps the same
+    shortest paths, so Dijkstra can be run from every source. The Dijkstra runs are split in chunks
+    across a pool of worker processes, which open the reweighted graph from a memory-mapped binary
+    file (util.graph_io), and the rows are streamed to the caller one by one: only O(V + E) memory
+    is needed unless the whole matrix is requested.
+    Time Complexity: O(VE + V(E + V)log(V)) spread over the workers
+    """
+
+    def __init__(self, graph):
+        if isinstance(graph, AdjacencyMatrix):
+            graph = graph.to_adjacency_list()
+        self.graph = graph
+        n = len(graph)
+        self.n = n
+        self.potentials = None
+        self.reweighted = None
+        # Version of the graph the potentials were computed for
+        self.version = None
+
+
+    def compute_potentials(self):
+        # Runs Bellman-Ford from a virtual node n linked to every node, raising a ValueError if the
+        # graph has a negative cycle, and builds the reweighted graph as a CompressedSparseRow.
+        n = self.n
+        augmented = AdjacencyList(n + 1)
+        for node in range(n):
+            augmented.graph[node] = list(self.graph[node])
+            augmented.graph[n].append((node, 0))
+        dist = BellmanFordAlgorithm(augmented).solve_spfa(n)
+        if -math.inf in dist:
+            raise ValueError("Johnson's algorithm does not support graphs with negative cycles!")
+        h = dist[:n]
+
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = []
+        for node_from in range(n):
+            for node_to, edge_cost in self.graph[node_from]:
+                targets.append(node_to)
+                # Never negative up to floating point rounding
+                weights.append(max(0, edge_cost + h[node_from] - h[node_to]))
+            offsets.append(len(targets))
+        self.potentials = array('q', h) if all(type(value) is int for value in h) else array('d', h)
+        self.reweighted = CompressedSparseRow.from_arrays(offsets, targets, CompressedSparseRow.pack_weights(weights))
+        self.version = getattr(self.graph, 'version', 0)
+
+
+    def iterate_rows(self, sources=None, workers=None, chunk_size=None):
+        # Yields (source, row) pairs in the order of 'sources' (default: every node), where
+        # row[v] is the shortest distance from source to v (math.inf if unreachable).
+        if self.potentials is None or self.version != getattr(self.graph, 'version', 0):
+            self.compute_potentials()
+        sources = list(range(self.n)) if sources is None else list(sources)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(sources)))
+        if chunk_size is None:
+            chunk_size = max(1, math.ceil(len(sources) / (4 * workers)))
+        chunks = [sources[i:i + chunk_size] for i in range(0, len(sources), chunk_size)]
+
+        if workers == 1:
+            init_worker(self.reweighted, self.potentials)
+            for chunk in chunks:
+                yield from zip(chunk, solve_chunk(chunk))
+            return None
+
+        # The workers share one memory-mapped copy of the reweighted graph
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'reweighted.bin')
+            save_graph(self.reweighted, path)
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                     initargs=(path, self.potentials)) as executor:
+                for chunk, rows in zip(chunks, executor.map(solve_chunk, chunks)):
+                    yield from zip(chunk, rows)
+
+
+    def solve(self, sink=None, path=None, sources=None, workers=None, chunk_size=None):
+        # Computes the shortest distances from every node of 'sources' (default: every node) to
+        # every node. The rows are
+        #   - passed to sink(source, row) as they are computed when a sink is given (returns None),
+        #   - written to the file 'path' when given, as consecutive rows of n float64 values, and
+        #     returned as a list of rows of a read-only memory mapping of that file,
+        #   - otherwise returned as a list of array('d') rows.
+        # Raises a ValueError if the graph has a negative cycle.
+        rows = self.iterate_rows(sources, workers, chunk_size)
+        if sink is not None:
+            for source, row in rows:
+                sink(source, row)
+            return None
+        if path is None:
+            return [row for _, row in rows]
+
+        count = 0
+        with open(path, 'wb') as f:
+            for _, row in rows:
+                f.write(memoryview(row).cast('B'))
+                count += 1
+        if count == 0:
+            return []
+        view = memoryview(map_file(path)).cast('d')
+        return [view[i * self.n:(i + 1) * self.n] for i in range(count)]
+
+
+if __name__ == "__main__":
+    graph = AdjacencyList(5)
+    graph.add_edge(0, 1, 4)
+    graph.add_edge(0, 2, 1)
+    graph.add_edge(2, 1, -2)
+    graph.add_edge(1, 3, 2)
+    graph.add_edge(3, 4, -1)
+    graph.add_edge(4, 2, 3)
+
+    johnson = JohnsonAlgorithm(graph)
+    for row in johnson.solve(workers=2):
+        print(row.tolist())
+    johnson.solve(sink=lambda source, row: print(source, row.tolist()), sources=[0, 3], workers=1)
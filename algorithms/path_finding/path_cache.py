@@ -0,0 +1,148 @@
+from util.graph_structures import AdjacencyList
+from algorithms.path_finding.dijkstra import DijkstraAlgorithm
+from collections import OrderedDict
+from array import array
+import math
+
+class ShortestPathCache:
+    """
+    Opt-in LRU cache in front of a path finding algorithm (DijkstraAlgorithm, AStarAlgorithm,
+    ContractionHierarchyAlgorithm, ...). Results are keyed on (graph version, algorithm, start, end)
+    and the least recently used entries are evicted once 'maxsize' is reached. Every call compares
+    the version of the graph with the one the cache was filled with, so mutating the graph through
+    add_edge/add_edges empties the cache automatically. The algorithm is then brought up to date as
+    well, since it may hold state derived from the old graph (a converted graph, a contraction
+    hierarchy, landmark tables): it is rebuilt with 'factory' when one is given, refreshed in place
+    when it has a refresh method (Dijkstra), and a ValueError is raised otherwise.
+    With cache_trees=True and an algorithm providing solve_all (Dijkstra), a miss computes the whole
+    one-to-all shortest path tree of the start node instead, so any later query from the same
+    start node is answered without a search. At most 'max_trees' trees (O(V) memory each) are kept.
+    """
+
+    def __init__(self, algorithm, graph=None, maxsize=1024, cache_trees=False, max_trees=16, factory=None):
+        # 'graph' is the graph whose version is watched. It defaults to the algorithm's graph and
+        # should be given when the algorithm was built from a converted graph (e.g. a matrix).
+        # 'factory' builds a new algorithm from the graph after a mutation, for instance
+        # ContractionHierarchyAlgorithm or lambda graph: AStarAlgorithm(graph, LandmarkHeuristic(graph)).
+        self.graph = graph if graph is not None else algorithm.graph
+        self.factory = factory
+        self.maxsize = maxsize
+        self.max_trees = max_trees
+        self.use_trees = cache_trees
+        self.set_algorithm(algorithm)
+        self.entries = OrderedDict()
+        self.trees = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.version = self.graph_version()
+
+
+    def set_algorithm(self, algorithm):
+        self.algorithm = algorithm
+        self.name = type(algorithm).__name__
+        self.cache_trees = self.use_trees and hasattr(algorithm, 'solve_all')
+        # Dijkstra has an eager and a lazy variant, the other algorithms a single solve
+        self.solve = getattr(algorithm, 'solve_eager', None) or algorithm.solve
+
+
+    def graph_version(self):
+        return self.graph.version if self.graph is not None else 0
+
+
+    def check_version(self):
+        # Drop everything computed on an older version of the graph, and update the algorithm.
+        version = self.graph_version()
+        if version != self.version:
+            self.clear()
+            if self.factory is not None:
+                self.set_algorithm(self.factory(self.graph))
+            elif hasattr(self.algorithm, 'refresh'):
+                self.algorithm.refresh(self.graph)
+            else:
+                raise ValueError(f"{self.name} cannot be refreshed after the graph changed, "
+                                 "give the cache a factory!")
+            self.version = version
+
+
+    def clear(self):
+        self.entries.clear()
+        self.trees.clear()
+
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries),
+                'trees': len(self.trees), 'maxsize': self.maxsize}
+
+
+    def distance(self, start, end):
+        # Returns the shortest distance from 'start' to 'end' (math.inf if unreachable).
+        return self.lookup(start, end, 'distance')
+
+
+    def reconstruct_path(self, start, end):
+        # Returns the shortest path from 'start' to 'end' inclusive, or an empty list.
+        return list(self.lookup(start, end, 'path'))
+
+
+    def lookup(self, start, end, kind):
+        self.check_version()
+        if self.cache_trees:
+            return self.tree_lookup(start, end, kind)
+
+        key = (self.version, self.name, kind, start, end)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        if kind == 'distance':
+            value = self.solve(start, end)
+        else:
+            value = tuple(self.algorithm.reconstruct_path(start, end))
+        self.entries[key] = value
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return value
+
+
+    def tree_lookup(self, start, end, kind):
+        key = (self.version, self.name, start)
+        if key in self.trees:
+            self.hits += 1
+            self.trees.move_to_end(key)
+        else:
+            self.misses += 1
+            dist, prev = self.algorithm.solve_all(start)
+            # Copies, since the algorithm reuses its arrays for the next query
+            self.trees[key] = (list(dist), array('q', [-1 if node is None else node for node in prev]))
+            if len(self.trees) > self.max_trees:
+                self.trees.popitem(last=False)
+        dist, prev = self.trees[key]
+
+        if kind == 'distance':
+            return dist[end]
+        path = []
+        if dist[end] == math.inf:
+            return path
+        at = end
+        while at != -1:
+            path.append(at)
+            at = prev[at]
+        path.reverse()
+        return path
+
+
+if __name__ == "__main__":
+    graph = AdjacencyList(5)
+    graph.add_edge(0, 1, 4)
+    graph.add_edge(0, 2, 1)
+    graph.add_edge(1, 3, 1)
+    graph.add_edge(2, 1, 2)
+    graph.add_edge(2, 3, 5)
+    graph.add_edge(3, 4, 3)
+
+    cache = ShortestPathCache(DijkstraAlgorithm(graph), maxsize=128)
+    print(cache.reconstruct_path(0, 4), cache.reconstruct_path(0, 4), cache.info())
+    graph.add_edge(0, 4, 2)
+    print(cache.reconstruct_path(0, 4), cache.info())
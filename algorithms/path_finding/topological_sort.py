@@ -14,7 +14,7 @@ class TopologicalSortAlgorithm:
 
     def __init__(self, graph):
         if isinstance(graph, AdjacencyMatrix):
-            graph = AdjacencyList(graph)
+            graph = graph.to_adjacency_list()
         self.graph = graph
         n = len(self.graph)
         self.n = n
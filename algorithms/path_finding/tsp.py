@@ -1,17 +1,49 @@
-from util.graph_structures import AdjacencyList, AdjacencyMatrix
+from util.graph_structures import AdjacencyList, AdjacencyMatrix, CompressedSparseRow
+from algorithms.path_finding.dijkstra import DijkstraAlgorithm
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import heapq
 import math
 import itertools
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class TSPAlgorithm:
     """
     Brute Force: Time Complexity: O(n!)
     Dynamic Programming: Time Complexity: O(n^2 * 2^n) Space Complexity: O(n * 2^n)
+    The solver is picked with the 'method' argument of get_tour/get_tour_cost: 'brute', 'dp'
+    (recursive, the default) or 'held_karp' (iterative and vectorized with NumPy, much faster),
+    'heuristic' for large instances (good tours, not proven optimal) or 'branch_and_bound' for
+    provably optimal tours of symmetric instances beyond the reach of the DP. Extra keyword arguments
+    are passed to the solver, e.g. get_tour(method='heuristic', time_limit=5).
+    Given a list of waypoints, the graph can be any sparse graph (e.g. a road network): the tour
+    only visits the waypoints, over the matrix of shortest path distances between them (metric
+    closure), and get_route expands it into the full route through the graph.
     Based on original code in Java from: https://github.com/williamfiset/Algorithms
     """
 
-    def __init__(self, graph, start_node=0):
-        if isinstance(graph, AdjacencyList):
-            graph = AdjacencyMatrix(graph)
+    def __init__(self, graph, start_node=0, waypoints=None):
+        # With waypoints, start_node is the waypoint the tour starts from (default: the first one)
+        # and get_tour returns graph nodes instead of matrix indexes.
+        self.waypoints = None
+        if waypoints is not None:
+            # A tour visits every stop once, so a repeated waypoint is only kept once
+            waypoints = list(dict.fromkeys(waypoints))
+            if start_node not in waypoints:
+                start_node = waypoints[0]
+            graph = self.metric_closure(graph, waypoints)
+            start_node = waypoints.index(start_node)
+        if isinstance(graph, (AdjacencyList, CompressedSparseRow)):
+            # Sparse rows avoid allocating the full matrix, missing entries still read as math.inf
+            graph = graph.to_adjacency_matrix(sparse=True)
         self.graph = graph
         n = len(graph)
         self.n = n
@@ -25,26 +57,77 @@ class TSPAlgorithm:
         self.solved = False
 
 
-    def get_tour(self, brute=False):
+    def get_tour(self, brute=False, method=None, **options):
         # Returns the optimal tour for the traveling salesman problem.
         if not self.solved:
-            if brute:
-                self.solve_brute_force()
-            else:
-                self.solve_dp()
+            self.solve(method if method is not None else ('brute' if brute else None), **options)
+        if self.waypoints is not None:
+            return [self.waypoints[i] for i in self.tour]
         return self.tour
+
+
+    def metric_closure(self, graph, waypoints):
+        # Returns the matrix of shortest path distances between the waypoints, running Dijkstra
+        # once from each of them. The shortest path trees are kept (as arrays of predecessors, -1
+        # for none) to expand the tour into a route.
+        if isinstance(graph, AdjacencyMatrix):
+            graph = graph.to_adjacency_list()
+        self.waypoints = waypoints
+        self.trees = []
+        dijkstra = DijkstraAlgorithm(graph)
+        matrix = []
+        for waypoint in waypoints:
+            dist, prev = dijkstra.solve_all(waypoint)
+            matrix.append([dist[other] for other in waypoints])
+            self.trees.append(array('q', [-1 if node is None else node for node in prev]))
+        return matrix
+
+
+    def get_route(self, brute=False, method=None, **options):
+        # Returns the tour expanded into the nodes of the graph, from the start waypoint back to
+        # it, following the shortest paths between consecutive waypoints. Empty if there is no
+        # tour. Only available when the instance was built with waypoints.
+        if self.waypoints is None:
+            raise ValueError("Routes are only available for tours over waypoints!")
+        self.get_tour(brute, method, **options)
+        # Positions in the list of waypoints
+        indexes = list(self.tour)
+        if not indexes or self.min_tour_cost == math.inf:
+            return []
+        if len(indexes) > 1 and indexes[0] == indexes[-1]:
+            indexes.pop()
+        # Brute force tours are not rotated to the start node
+        first = indexes.index(self.START_NODE)
+        indexes = indexes[first:] + indexes[:first + 1]
+        route = [self.waypoints[indexes[0]]]
+        for a, b in zip(indexes, indexes[1:]):
+            # Walk back the shortest path tree of waypoint a from waypoint b
+            path, node = [], self.waypoints[b]
+            while node != self.waypoints[a]:
+                path.append(node)
+                node = self.trees[a][node]
+            route.extend(reversed(path))
+        return route
     
 
-    def get_tour_cost(self, brute=False):
+    def get_tour_cost(self, brute=False, method=None, **options):
         # Returns the minimal tour cost.
         if not self.solved:
-            if brute:
-                self.solve_brute_force()
-            else:
-                self.solve_dp()
+            self.solve(method if method is not None else ('brute' if brute else None), **options)
         return self.min_tour_cost
 
 
+    def solve(self, method=None, **options):
+        # Runs the solver named 'method', by default the recursive DP.
+        if method is None:
+            method = 'dp'
+        solvers = {'brute': self.solve_brute_force, 'dp': self.solve_dp, 'held_karp': self.solve_held_karp,
+                   'heuristic': self.solve_heuristic, 'branch_and_bound': self.solve_branch_and_bound}
+        if method not in solvers:
+            raise ValueError(f"Unknown TSP method {method!r}")
+        solvers[method](**options)
+
+
 
     def solve_brute_force(self):
         """
@@ -156,6 +239,559 @@ class TSPAlgorithm:
 
         return min_cost
 
+    def solve_held_karp(self):
+        """
+        Bottom-up Held-Karp: cost[S][k] is the cheapest path leaving the start node, visiting exactly
+        the nodes of the subset S (of the n-1 other nodes) and ending at k. Subsets are processed by
+        increasing number of nodes, and for each end node k all the subsets of a layer are computed
+        at once as a NumPy minimum over the predecessor j:
+            cost[S][k] = min(cost[S - {k}][j] + distance[j][k])
+        The tables hold costs and int8 predecessors for the 2^(n-1) subsets without the start node.
+        Costs are float32 when every sum of n costs is exact in float32 (integer costs with a total
+        of at most 2^24), about 5 * (n-1) * 2^(n-1) bytes (50 MB for n = 20), and float64 otherwise,
+        about 9 * (n-1) * 2^(n-1) bytes. The cost of the tour found is then recomputed exactly from
+        the graph.
+        Time Complexity: O(n^2 * 2^n) Space Complexity: O(n * 2^n)
+        """
+        if np is None:
+            raise ImportError("NumPy is required to run the Held-Karp solver!")
+        if self.n > 25:
+            raise ValueError("Matrix too large! The Held-Karp tables would not fit in memory.")
+
+        start = self.START_NODE
+        others = [node for node in range(self.n) if node != start]
+        m = len(others)
+        distance = np.array([[self.distance[a][b] for b in others] for a in others], dtype=np.float64).reshape(m, m)
+        from_start = np.array([self.distance[start][b] for b in others], dtype=np.float64)
+        to_start = np.array([self.distance[a][start] for a in others], dtype=np.float64)
+        finite = np.concatenate((distance.ravel(), from_start, to_start))
+        finite = finite[np.isfinite(finite)]
+        if np.all(finite == np.round(finite)) and self.n * np.abs(finite).max(initial=0) <= 1 << 24:
+            dtype = np.float32
+            distance, from_start, to_start = distance.astype(dtype), from_start.astype(dtype), to_start.astype(dtype)
+        else:
+            dtype = np.float64
+
+        # Subsets are bit masks over the indexes of 'others'
+        masks = np.arange(1 << m, dtype=np.int64)
+        cost = np.full((1 << m, m), np.inf, dtype=dtype)
+        prev = np.full((1 << m, m), -1, dtype=np.int8)
+        for k in range(m):
+            cost[1 << k, k] = from_start[k]
+
+        # Group the subsets by popcount, in increasing order of masks within each layer
+        popcount = np.zeros(1 << m, dtype=np.int8)
+        for bit in range(m):
+            popcount += (masks >> bit) & 1
+        order = np.argsort(popcount, kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(popcount, minlength=m + 1))))
+
+        for size in range(2, m + 1):
+            layer = order[bounds[size]:bounds[size + 1]]
+            for k in range(m):
+                subsets = layer[(layer >> k) & 1 == 1]
+                # Candidates for every subset and predecessor j, math.inf when j is not in the subset
+                candidates = cost[subsets ^ (1 << k)] + distance[:, k]
+                best = candidates.argmin(axis=1)
+                cost[subsets, k] = candidates[np.arange(len(subsets)), best]
+                prev[subsets, k] = best
+
+        self.tour = []
+        if m == 0:
+            self.tour = [start, start]
+        else:
+            full = (1 << m) - 1
+            totals = cost[full] + to_start
+            last = int(totals.argmin())
+            if totals[last] != math.inf:
+                # Walk the predecessors back from the last node
+                path, state, k = [], full, last
+                while k != -1:
+                    path.append(others[k])
+                    state, k = state ^ (1 << k), int(prev[state, k])
+                self.tour = [start] + path[::-1] + [start]
+        self.min_tour_cost = self.compute_tour_cost(self.tour) if self.tour else math.inf
+        self.solved = True
+
+    def solve_heuristic(self, time_limit=None, construction='nearest_neighbour', neighbours=10, seed=None):
+        """
+        Heuristic solver for instances far too large for the exact methods. A first tour is built
+        with the nearest neighbour or the greedy edge heuristic and improved by local search with
+        2-opt (reverse a segment) and Or-opt (move a segment of up to 3 nodes) moves. Only moves
+        creating an edge to one of the 'neighbours' closest nodes are tried, and nodes whose
+        surroundings did not change since they last failed to improve are skipped (don't-look
+        bits). With a time_limit (in seconds), the remaining time is spent kicking the best tour
+        with random double-bridge moves and optimizing it again (iterated local search), keeping
+        the best tour found so far. Without it a single local search is run to convergence.
+        Time Complexity: O(n^2) to build the tour, then each local search round is about O(n*k)
+        """
+        if construction not in ('nearest_neighbour', 'greedy'):
+            raise ValueError(f"Unknown construction heuristic {construction!r}")
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        n, start = self.n, self.START_NODE
+        rows = [self.graph.row(i) for i in range(n)] if hasattr(self.graph, 'row') else self.distance
+        symmetric = all(rows[i][j] == rows[j][i] for i in range(n) for j in range(i))
+        nearest = [heapq.nsmallest(neighbours, (j for j in range(n) if j != i), key=rows[i].__getitem__)
+                   for i in range(n)]
+
+        if construction == 'greedy':
+            tour = self.greedy_edge_tour(rows, nearest)
+        else:
+            tour = self.nearest_neighbour_tour(rows, nearest)
+        optimizer = TourOptimizer(rows, tour, nearest, symmetric)
+        optimizer.optimize(tour, deadline)
+        best_tour, best_cost = optimizer.tour, optimizer.cost()
+
+        rng = random.Random(seed)
+        while deadline is not None and n >= 8 and time.perf_counter() < deadline:
+            # Double bridge: t[:p1] + t[p2:p3] + t[p1:p2] + t[p3:], start node kept first
+            p1, p2, p3 = sorted(rng.sample(range(1, n), 3))
+            tour = best_tour[:p1] + best_tour[p2:p3] + best_tour[p1:p2] + best_tour[p3:]
+            optimizer = TourOptimizer(rows, tour, nearest, symmetric)
+            optimizer.optimize([tour[i] for i in (p1 - 1, p1, p2 - 1, p2, p3 - 1, p3 % n)], deadline)
+            cost = optimizer.cost()
+            if cost < best_cost:
+                best_tour, best_cost = optimizer.tour, cost
+
+        self.tour = best_tour + [start]
+        self.min_tour_cost = self.compute_tour_cost(self.tour)
+        self.solved = True
+
+
+    def solve_branch_and_bound(self, workers=1, heuristic_time=None, root_iterations=200, node_iterations=10):
+        """
+        Exact branch and bound for symmetric instances. Tours are built depth first as paths from the
+        start node, and a path is discarded as soon as a lower bound on its best completion reaches
+        the cost of the best tour known. The bound is the Held-Karp 1-tree bound: a minimum spanning
+        tree of the unvisited nodes plus the cheapest edges joining it to both ends of the path,
+        with node penalties tuned by subgradient optimization (root_iterations at the root, then
+        node_iterations starting from the parent's penalties). When the penalized 1-tree is itself a
+        path the node is solved without branching. The first upper bound comes from the heuristic
+        solver, given heuristic_time seconds (default: 0.02 * n).
+        With workers > 1 the tree is first expanded breadth first and the open subtrees are
+        explored by a pool of processes sharing the best tour cost.
+        Counters (nodes, bounds, pruned, upper bound updates, ...) are left in self.stats.
+        Time Complexity: exponential in the worst case, O(n^2) per bound iteration
+        """
+        n, start = self.n, self.START_NODE
+        rows = [self.graph.row(i) for i in range(n)] if hasattr(self.graph, 'row') else self.distance
+        if any(rows[i][j] != rows[j][i] for i in range(n) for j in range(i)):
+            raise ValueError("Branch and bound requires a symmetric distance matrix!")
+
+        self.solve_heuristic(time_limit=heuristic_time if heuristic_time is not None else 0.02 * n)
+        upper, upper_tour = self.min_tour_cost, self.tour[:-1]
+        bounder = OneTreeBound(rows, start, node_iterations)
+        self.stats = {'nodes': 0, 'bounds': 1, 'pruned': 0, 'upper_bound_updates': 0,
+                      'initial_upper_bound': upper}
+        root_bound, penalties, tour = bounder.evaluate([start], 0, [0] * n, upper, root_iterations)
+        self.stats['root_bound'] = root_bound
+        open_nodes = [(root_bound, [start], 0, penalties)]
+        if tour is not None and bounder.path_cost(tour) < upper:
+            upper, upper_tour = bounder.path_cost(tour), tour
+            self.stats['upper_bound_updates'] += 1
+
+        if workers > 1:
+            # Expand breadth first until there are enough subtrees to share
+            while open_nodes and len(open_nodes) < 4 * workers:
+                nodes = open_nodes
+                open_nodes = []
+                for node in nodes:
+                    if node[0] >= upper - bounder.EPSILON:
+                        self.stats['pruned'] += 1
+                        continue
+                    children, found = bounder.expand(node, upper, self.stats)
+                    if found is not None and found[0] < upper:
+                        upper, upper_tour = found
+                        self.stats['upper_bound_updates'] += 1
+                    open_nodes.extend(children)
+            best = multiprocessing.Value('d', upper)
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_bound_worker,
+                                     initargs=(bounder, best)) as executor:
+                for found, stats in executor.map(solve_subtree, open_nodes):
+                    for key in ('nodes', 'bounds', 'pruned', 'upper_bound_updates'):
+                        self.stats[key] += stats[key]
+                    if found is not None and found[0] < upper:
+                        upper, upper_tour = found
+        else:
+            found = bounder.search(open_nodes, upper, self.stats)
+            if found is not None:
+                upper, upper_tour = found
+
+        self.tour = upper_tour + [start]
+        self.min_tour_cost = self.compute_tour_cost(self.tour)
+        self.solved = True
+
+
+    def nearest_neighbour_tour(self, rows, nearest):
+        # Builds a tour from the start node by always moving to the closest unvisited node,
+        # looking at the neighbour lists first and scanning every node only when they are used up.
+        n = self.n
+        visited = [False] * n
+        node = self.START_NODE
+        visited[node] = True
+        tour = [node]
+        for _ in range(n - 1):
+            row = rows[node]
+            node = next((j for j in nearest[node] if not visited[j]), None)
+            if node is None:
+                node = min((j for j in range(n) if not visited[j]), key=row.__getitem__)
+            visited[node] = True
+            tour.append(node)
+        return tour
+
+
+    def greedy_edge_tour(self, rows, nearest):
+        # Builds a tour by adding the cheapest edges between neighbours that keep every node with
+        # at most one outgoing and one incoming edge and do not close a cycle. The resulting paths
+        # are then chained, always jumping from the end of a path to the closest unused path start.
+        n = self.n
+        parent = list(range(n))
+
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        successor = [None] * n
+        has_predecessor = [False] * n
+        edges = sorted((rows[i][j], i, j) for i in range(n) for j in nearest[i])
+        for _, i, j in edges:
+            if successor[i] is None and not has_predecessor[j] and find(i) != find(j):
+                successor[i] = j
+                has_predecessor[j] = True
+                parent[find(i)] = find(j)
+
+        heads = {node for node in range(n) if not has_predecessor[node]}
+        # Head of the path holding the start node
+        head = self.START_NODE
+        while head not in heads:
+            head = next(i for i in range(n) if successor[i] == head)
+        tour = []
+        while True:
+            heads.discard(head)
+            node = head
+            while node is not None:
+                tour.append(node)
+                node = successor[node]
+            if not heads:
+                break
+            head = min(heads, key=rows[tour[-1]].__getitem__)
+        # Rotate the tour so that it begins at the start node
+        first = tour.index(self.START_NODE)
+        return tour[first:] + tour[:first]
+
+
+# Per worker process state of the parallel branch and bound, set up by init_bound_worker
+worker_bounder = None
+worker_best = None
+
+
+def init_bound_worker(bounder, best):
+    global worker_bounder, worker_best
+    worker_bounder = bounder
+    worker_best = best
+
+
+def solve_subtree(node):
+    # Explores the subtree of one open node, returning ((cost, tour) or None, counters).
+    stats = {'nodes': 0, 'bounds': 0, 'pruned': 0, 'upper_bound_updates': 0}
+    found = worker_bounder.search([node], worker_best.value, stats, worker_best)
+    return found, stats
+
+
+class OneTreeBound:
+
+    # Held-Karp 1-tree lower bounds for the branch and bound. A node of the search is a path
+    # from the start node; its remaining part is a path from the last node back to the start
+    # through every unvisited node U. Merging both ends of the path into one node z, this is a
+    # cycle through z and U, and every such cycle is a 1-tree: a spanning tree of U plus one edge
+    # from the last node and one edge to the start. With penalties pi on the nodes of U, any
+    # 1-tree with edge weights d(i, j) + pi[i] + pi[j] minus 2 * sum(pi) bounds the cost of the
+    # remaining path, and pi is moved along the degree excess (deg - 2) to raise the bound.
+
+    EPSILON = 1e-9
+
+    def __init__(self, rows, start, iterations):
+        self.rows = rows
+        self.n = len(rows)
+        self.start = start
+        self.iterations = iterations
+        # Tour costs are integers, so bounds can be rounded up
+        self.integral = all(type(rows[i][j]) is int for i in range(self.n) for j in range(self.n))
+
+    def path_cost(self, tour):
+        return sum(self.rows[tour[i - 1]][tour[i]] for i in range(1, len(tour))) + self.rows[tour[-1]][tour[0]]
+
+    def evaluate(self, path, cost, penalties, upper, iterations):
+        # Returns (bound, penalties, tour): the best bound found for the node, the penalties that
+        # gave it and, when the optimal completion was found directly, the full tour (else None).
+        rows, start, last = self.rows, self.start, path[-1]
+        on_path = set(path)
+        remaining = [node for node in range(self.n) if node not in on_path]
+        if len(remaining) <= 1:
+            # At most one way to finish the tour
+            tour = path + remaining
+            for node in remaining:
+                cost += rows[last][node]
+            return cost + rows[tour[-1]][start], penalties, tour
+
+        best_bound, best_penalties = -math.inf, penalties
+        penalties = list(penalties)
+        # The step is halved after 'patience' iterations without improving the bound
+        step, patience, stalled = 2.0, max(3, iterations // 20), 0
+        for _ in range(iterations):
+            value, degree, adjacency, first, final = self.one_tree(remaining, last, penalties)
+            if value == math.inf:
+                return math.inf, penalties, None
+            bound = cost + value - 2 * sum(penalties[node] for node in remaining)
+            if self.integral:
+                bound = math.ceil(bound - self.EPSILON)
+            if bound > best_bound:
+                best_bound, best_penalties, stalled = bound, penalties[:], 0
+            else:
+                stalled += 1
+                if stalled == patience:
+                    step, stalled = step / 2, 0
+            if best_bound >= upper - self.EPSILON:
+                break
+            excess = [degree[node] - 2 for node in remaining]
+            norm = sum(x * x for x in excess)
+            if norm == 0:
+                # The 1-tree is a path from 'first' to 'final': the optimal completion
+                tour, previous, node = list(path), None, first
+                while node is not None:
+                    tour.append(node)
+                    previous, node = node, next((other for other in adjacency[node] if other != previous), None)
+                return best_bound, best_penalties, tour
+            target = upper if upper != math.inf else abs(bound) * 1.05 + 1
+            size = step * (target - bound) / norm
+            for node, x in zip(remaining, excess):
+                penalties[node] += size * x
+        return best_bound, best_penalties, None
+
+    def one_tree(self, remaining, last, penalties):
+        # Minimum 1-tree of the remaining nodes with penalized weights (Prim's algorithm), returning
+        # its weight, the degree and tree neighbours of every node and the nodes joined to the
+        # last node and to the start node.
+        rows, start = self.rows, self.start
+        degree = {node: 0 for node in remaining}
+        adjacency = {node: [] for node in remaining}
+        key = {node: math.inf for node in remaining[1:]}
+        parent = {}
+        value = 0
+        node = remaining[0]
+        while key:
+            row, penalty = rows[node], penalties[node]
+            for other in key:
+                weight = row[other] + penalty + penalties[other]
+                if weight < key[other]:
+                    key[other] = weight
+                    parent[other] = node
+            node = min(key, key=key.__getitem__)
+            value += key.pop(node)
+            if value == math.inf:
+                return math.inf, degree, adjacency, None, None
+            degree[node] += 1
+            degree[parent[node]] += 1
+            adjacency[node].append(parent[node])
+            adjacency[parent[node]].append(node)
+
+        # Cheapest distinct pair of edges last -> first and final -> start
+        from_last = heapq.nsmallest(2, remaining, key=lambda node: rows[last][node] + penalties[node])
+        to_start = heapq.nsmallest(2, remaining, key=lambda node: rows[node][start] + penalties[node])
+        pairs = [(rows[last][a] + penalties[a] + rows[b][start] + penalties[b], a, b)
+                 for a in from_last for b in to_start if a != b]
+        weight, first, final = min(pairs)
+        degree[first] += 1
+        degree[final] += 1
+        return value + weight, degree, adjacency, first, final
+
+    def expand(self, node, upper, stats):
+        # Returns the children of an open node that survive the bound, sorted by decreasing bound,
+        # and the best (cost, tour) completed directly while bounding them (or None).
+        bound, path, cost, penalties = node
+        stats['nodes'] += 1
+        last = path[-1]
+        on_path = set(path)
+        children, found = [], None
+        for node_to in range(self.n):
+            if node_to in on_path:
+                continue
+            child_path = path + [node_to]
+            child_cost = cost + self.rows[last][node_to]
+            child_bound, child_penalties, tour = self.evaluate(child_path, child_cost, penalties, upper, self.iterations)
+            stats['bounds'] += 1
+            if tour is not None:
+                tour_cost = self.path_cost(tour)
+                if tour_cost < upper - self.EPSILON:
+                    upper, found = tour_cost, (tour_cost, tour)
+            elif child_bound < upper - self.EPSILON:
+                children.append((child_bound, child_path, child_cost, child_penalties))
+            else:
+                stats['pruned'] += 1
+        children.sort(key=lambda child: child[0], reverse=True)
+        return children, found
+
+    def search(self, open_nodes, upper, stats, shared=None):
+        # Depth first search from 'open_nodes', always going down the child with the lowest bound
+        # first. Returns the best (cost, tour) found below 'upper', or None. 'shared' is an optional
+        # multiprocessing.Value holding the best cost known by all the processes.
+        stack = sorted(open_nodes, key=lambda node: node[0], reverse=True)
+        found = None
+        while stack:
+            node = stack.pop()
+            if shared is not None:
+                upper = min(upper, shared.value)
+            if node[0] >= upper - self.EPSILON:
+                stats['pruned'] += 1
+                continue
+            children, child_found = self.expand(node, upper, stats)
+            if child_found is not None and child_found[0] < upper:
+                upper, found = child_found[0], child_found
+                stats['upper_bound_updates'] += 1
+                if shared is not None:
+                    with shared.get_lock():
+                        shared.value = min(shared.value, upper)
+            stack.extend(children)
+        return found
+
+
+class TourOptimizer:
+
+    # 2-opt and Or-opt local search on a tour stored as a list of the n nodes, with the start node
+    # kept at position 0 and pos[node] giving the position of every node. Asymmetric distances are
+    # supported: reversing a segment also changes the cost of its inner edges, which is read from
+    # prefix sums of the forward and backward edge costs along the tour.
+
+    EPSILON = 1e-9
+
+    def __init__(self, rows, tour, nearest, symmetric):
+        self.rows = rows
+        self.tour = list(tour)
+        self.n = len(tour)
+        self.nearest = nearest
+        self.symmetric = symmetric
+        self.pos = [0] * self.n
+        self.forward = [0] * self.n
+        self.backward = [0] * self.n
+        self.update(0)
+
+    def update(self, first):
+        # Refreshes the positions and the prefix sums from position 'first' on.
+        tour, rows = self.tour, self.rows
+        for i in range(first, self.n):
+            self.pos[tour[i]] = i
+        if not self.symmetric:
+            for i in range(max(first, 1), self.n):
+                self.forward[i] = self.forward[i - 1] + rows[tour[i - 1]][tour[i]]
+                self.backward[i] = self.backward[i - 1] + rows[tour[i]][tour[i - 1]]
+
+    def after(self, i):
+        # Node following position i on the (cyclic) tour.
+        return self.tour[i + 1] if i + 1 < self.n else self.tour[0]
+
+    def cost(self):
+        return sum(self.rows[self.tour[i]][self.after(i)] for i in range(self.n))
+
+    def optimize(self, nodes, deadline=None):
+        # Improves the tour until no move helps or the deadline passes, starting from 'nodes'.
+        queue = deque(nodes)
+        queued = [False] * self.n
+        for node in nodes:
+            queued[node] = True
+        while queue:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            node = queue.popleft()
+            queued[node] = False
+            touched = self.two_opt(node) or self.or_opt(node)
+            if touched:
+                for other in touched:
+                    if not queued[other]:
+                        queued[other] = True
+                        queue.append(other)
+
+    def reverse_delta(self, x, y):
+        # Cost change of reversing tour[x..y] (1 <= x < y <= n-1).
+        rows, tour = self.rows, self.tour
+        p, s, e, q = tour[x - 1], tour[x], tour[y], self.after(y)
+        delta = rows[p][e] + rows[s][q] - rows[p][s] - rows[e][q]
+        if not self.symmetric:
+            delta += (self.backward[y] - self.backward[x]) - (self.forward[y] - self.forward[x])
+        return delta
+
+    def reverse(self, x, y):
+        touched = [self.tour[x - 1], self.tour[x], self.tour[y], self.after(y)]
+        self.tour[x:y + 1] = self.tour[x:y + 1][::-1]
+        self.update(x)
+        return touched
+
+    def two_opt(self, a):
+        # Tries to create the edge a -> c, or c -> a, by reversing a segment.
+        rows, tour, pos, n = self.rows, self.tour, self.pos, self.n
+        i = pos[a]
+        b = self.after(i)
+        for c in self.nearest[a]:
+            if not rows[a][c] < rows[a][b]:
+                break
+            # a = tour[x - 1] and c = tour[y]
+            y = pos[c]
+            if y > i + 1 and self.reverse_delta(i + 1, y) < -self.EPSILON:
+                return self.reverse(i + 1, y)
+        y = (i if i > 0 else n) - 1
+        for c in self.nearest[a]:
+            if not rows[c][a] < rows[tour[y]][a]:
+                continue
+            # c = tour[x] and a = tour[y + 1]
+            x = pos[c]
+            if 1 <= x < y and self.reverse_delta(x, y) < -self.EPSILON:
+                return self.reverse(x, y)
+        return None
+
+    def or_opt(self, a):
+        # Tries to move the segment of 1 to 3 nodes starting at 'a' between two neighbours,
+        # possibly reversed.
+        rows, tour, pos, n = self.rows, self.tour, self.pos, self.n
+        x = pos[a]
+        if x == 0:
+            return None
+        for length in (1, 2, 3):
+            y = x + length - 1
+            if y >= n:
+                break
+            p, s, e, q = tour[x - 1], tour[x], tour[y], self.after(y)
+            segment = tour[x:y + 1]
+            gain = rows[p][s] + rows[e][q] - rows[p][q]
+            if not gain > self.EPSILON:
+                continue
+            inner = sum(rows[segment[k]][segment[k + 1]] for k in range(length - 1))
+            inner_reversed = sum(rows[segment[k + 1]][segment[k]] for k in range(length - 1))
+            for c in set(self.nearest[s]) | set(self.nearest[e]):
+                j = pos[c]
+                if x - 1 <= j <= y:
+                    continue
+                f = self.after(j)
+                base = rows[c][f]
+                if rows[c][s] + rows[e][f] - base - gain < -self.EPSILON:
+                    return self.move(x, y, c, False)
+                if rows[c][e] + rows[s][f] + inner_reversed - inner - base - gain < -self.EPSILON:
+                    return self.move(x, y, c, True)
+        return None
+
+    def move(self, x, y, c, reverse):
+        # Moves tour[x..y] right after node c.
+        tour = self.tour
+        touched = [tour[x - 1], self.after(y), c, self.after(self.pos[c])] + tour[x:y + 1]
+        segment = tour[x:y + 1]
+        if reverse:
+            segment.reverse()
+        del tour[x:y + 1]
+        j = self.pos[c] if self.pos[c] < x else self.pos[c] - len(segment)
+        tour[j + 1:j + 1] = segment
+        self.update(min(x, j + 1))
+        return touched
+
 
 if __name__ == "__main__":
     n = 10
@@ -174,3 +810,10 @@ if __name__ == "__main__":
 
     tour_cost = tsp_solver.get_tour_cost()
     print("Tour cost:", tour_cost)
+
+    # Delivery stops on a sparse road network
+    roads = AdjacencyList(8)
+    for a, b, cost in [(0, 1, 4), (1, 2, 3), (2, 3, 2), (3, 4, 6), (4, 5, 1), (5, 6, 2), (6, 7, 5), (7, 0, 3), (1, 5, 7), (2, 6, 4)]:
+        roads.add_edge(a, b, cost, directed=False)
+    tsp_solver = TSPAlgorithm(roads, start_node=0, waypoints=[0, 3, 5, 6])
+    print("Stops:", tsp_solver.get_tour(), "Route:", tsp_solver.get_route(), "Cost:", tsp_solver.get_tour_cost())
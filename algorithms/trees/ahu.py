@@ -13,9 +13,9 @@ class AHUAlgorithm:
 
     def __init__(self, graph1, graph2):
         if isinstance(graph1, AdjacencyMatrix):
-            graph1 = AdjacencyList(graph1)
+            graph1 = graph1.to_adjacency_list()
         if isinstance(graph2, AdjacencyMatrix):
-            graph2 = AdjacencyList(graph2)
+            graph2 = graph2.to_adjacency_list()
         self.graph1 = graph1
         self.graph2 = graph2
 
@@ -25,12 +25,14 @@ class AHUAlgorithm:
         centers1 = CenterAlgorithm(self.graph1).solve()
         centers2 = CenterAlgorithm(self.graph2).solve()
 
-        tree1_rooted = RootingAlgorithm(self.graph1).build_tree(centers1[0])
-        tree1_encoded = self.encode(tree1_rooted)
+        # Both trees must share the same names for their canonical forms to be comparable
+        names = {}
+        tree1_rooted = RootingAlgorithm(self.graph1).build_array_tree(centers1[0])
+        tree1_encoded = self.encode_array(tree1_rooted, names)
 
         for center in centers2:
-            tree2_rooted = RootingAlgorithm(self.graph2).build_tree(center)
-            tree2_encoded = self.encode(tree2_rooted)
+            tree2_rooted = RootingAlgorithm(self.graph2).build_array_tree(center)
+            tree2_encoded = self.encode_array(tree2_rooted, names)
             # Two trees are isomorphic if their encoded
             # canonical forms are equal.
             if tree1_encoded == tree2_encoded:
@@ -52,6 +54,24 @@ class AHUAlgorithm:
         return '(' + ''.join(labels) + ')'
 
 
+    def encode_array(self, tree, names=None):
+        # Constructs the canonical form of an ArrayTree as an integer name. Each node is named
+        # after the sorted names of its children, processed bottom-up by walking the preorder
+        # backwards, so no recursion is needed and no long strings are built. Trees encoded
+        # with the same 'names' dictionary are isomorphic if their names are equal.
+        if names is None:
+            names = {}
+        labels = [None] * tree.n
+        for node in reversed(tree.preorder):
+            key = tuple(sorted(labels[child] for child in tree.get_children(node)))
+            label = names.get(key)
+            if label is None:
+                label = len(names)
+                names[key] = label
+            labels[node] = label
+        return labels[tree.root]
+
+
 if __name__ == "__main__":
     graph1 = AdjacencyList(5)
     graph1.add_edge(2, 0, directed=False)
@@ -2,14 +2,14 @@ from util.graph_structures import AdjacencyList, AdjacencyMatrix, Node
 
 class CenterAlgorithm:
     """
-    This algorithm finds the center(s) of a tree.
+    This algorithm finds the center(s) of a tree. The tree can also be given as an ArrayTree.
     Time Complexity: O(V+E)
     Based on original code in Java from: https://github.com/williamfiset/Algorithms
     """
 
     def __init__(self, graph):
         if isinstance(graph, AdjacencyMatrix):
-            graph = AdjacencyList(graph)
+            graph = graph.to_adjacency_list()
         self.graph = graph
         n = len(graph)
         self.n = n
@@ -1,4 +1,5 @@
-from util.graph_structures import AdjacencyList, AdjacencyMatrix, Node
+from util.graph_structures import AdjacencyList, AdjacencyMatrix, ArrayTree, Node
+from array import array
 
 class RootingAlgorithm:
     """
@@ -10,7 +11,7 @@ class RootingAlgorithm:
 
     def __init__(self, graph):
         if isinstance(graph, AdjacencyMatrix):
-            graph = AdjacencyList(graph)
+            graph = graph.to_adjacency_list()
         self.graph = graph
 
 
@@ -22,6 +23,28 @@ class RootingAlgorithm:
         return self.dfs(root, None)
 
 
+    def build_array_tree(self, root_index):
+        # Builds the rooted tree as an ArrayTree with an iterative depth first search, visiting
+        # children in the same order as build_tree.
+        n = len(self.graph)
+        parent = array('q', [-1]) * n
+        preorder = array('q')
+        visited = bytearray(n)
+        visited[root_index] = 1
+        stack = [root_index]
+
+        while stack:
+            node = stack.pop()
+            preorder.append(node)
+            # Push the children reversed so that they are popped in adjacency order
+            for edge in reversed(self.graph[node]):
+                if not visited[edge[0]]:
+                    visited[edge[0]] = 1
+                    parent[edge[0]] = node
+                    stack.append(edge[0])
+        return ArrayTree(root_index, parent, preorder)
+
+
     def dfs(self, node, parent):
         # Helper method to recursively build the tree.
 
@@ -48,3 +71,4 @@ if __name__ == "__main__":
 
     rooting = RootingAlgorithm(graph)
     print(rooting.build_tree(0))
+    print(list(rooting.build_array_tree(0).children))
@@ -1,4 +1,4 @@
-from util.graph_structures import AdjacencyList, AdjacencyMatrix, BinaryNode, Node
+from util.graph_structures import AdjacencyList, AdjacencyMatrix, ArrayTree, BinaryNode, Node
 
 class TreeHeightAlgorithm:
     """
@@ -10,10 +10,10 @@ class TreeHeightAlgorithm:
     def __init__(self, root):
         if isinstance(root, BinaryNode):
             self.binary = True
-        elif isinstance(root, Node):
+        elif isinstance(root, (Node, ArrayTree)):
             self.binary = False
         else:
-            raise TypeError("Argument must be a BinaryNode or a Node!")
+            raise TypeError("Argument must be a BinaryNode, a Node or an ArrayTree!")
         self.root = root
 
 
@@ -21,10 +21,23 @@ class TreeHeightAlgorithm:
         # Returns the height of the binary tree which is the number of edges from the
         # root to the deepest leaf node, or -1 if the input is an empty tree.
         node = self.root
+        if isinstance(node, ArrayTree):
+            return self.array_step(node)
 
         return self.recursive_step(node)
 
 
+    def array_step(self, tree):
+        # Computes the height bottom-up by walking the preorder backwards, so every node is
+        # processed after all of its children.
+        height = [0] * tree.n
+        parent = tree.parent
+        for node in reversed(tree.preorder):
+            if node != tree.root and height[parent[node]] < height[node] + 1:
+                height[parent[node]] = height[node] + 1
+        return height[tree.root]
+
+
     def recursive_step(self, node):
         # Returns the height of the binary tree which is the number of edges from the
         # root to the deepest leaf node, or -1 if the input is an empty tree.
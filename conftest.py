@@ -0,0 +1,2 @@
+# Makes pytest put the repository root on sys.path, so the tests import 'util' and 'algorithms'
+# the same way the modules do.
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from util.graph_structures import AdjacencyList, CompressedSparseRow
+from algorithms.path_finding.dijkstra import DijkstraAlgorithm
+
+np = pytest.importorskip('numpy')
+
+
+def numpy_csr(graph):
+    # CompressedSparseRow on top of NumPy arrays, with int64 weights
+    csr = CompressedSparseRow(graph)
+    return CompressedSparseRow.from_arrays(np.array(csr.offsets), np.array(csr.targets), np.array(csr.weights))
+
+
+def test_numpy_weights_above_bucket_limit():
+    graph = CompressedSparseRow.from_arrays(np.array([0, 1, 2, 2]), np.array([1, 2]), np.array([5000, 7000]))
+    assert DijkstraAlgorithm(graph).solve_eager(0, 2) == 12000
+
+
+@pytest.mark.parametrize('max_weight', [10, 5000, 10 ** 9])
+@pytest.mark.parametrize('queue', ['auto', 'dial', 'radix'])
+def test_numpy_csr_matches_heap(max_weight, queue):
+    if queue == 'dial' and max_weight > 5000:
+        pytest.skip("Too many buckets")
+    rnd = random.Random(max_weight)
+    n = 30
+    graph = AdjacencyList(n)
+    for _ in range(4 * n):
+        graph.add_edge(rnd.randrange(n), rnd.randrange(n), rnd.randint(0, max_weight))
+    expected = DijkstraAlgorithm(graph, queue='heap')
+    dijkstra = DijkstraAlgorithm(numpy_csr(graph), queue=queue)
+    for start in range(n):
+        for end in range(0, n, 3):
+            assert dijkstra.solve_eager(start, end) == expected.solve_eager(start, end)
@@ -0,0 +1,90 @@
+import math
+import random
+
+import pytest
+
+from util.graph_structures import AdjacencyMatrix
+from algorithms.path_finding.floyd_warshall import FloydWarshallAlgorithm
+
+np = pytest.importorskip('numpy')
+
+
+def random_graph(n, seed, weights):
+    rnd = random.Random(seed)
+    graph = AdjacencyMatrix(n, dtype='float64')
+    for u in range(n):
+        for v in range(n):
+            if u != v and rnd.random() < 0.5:
+                graph.add_edge(u, v, rnd.choice(weights))
+    return graph
+
+
+def path_cost(graph, path):
+    return sum(graph.graph[u][v] for u, v in zip(path, path[1:]))
+
+
+def check_blocked(graph, tile_size, workers):
+    n = len(graph)
+    plain = FloydWarshallAlgorithm(graph)
+    plain.solve()
+    blocked = FloydWarshallAlgorithm(graph)
+    blocked.solve_blocked(tile_size=tile_size, workers=workers)
+    assert (blocked.dp == plain.dp).all()
+    for i in range(n):
+        for j in range(n):
+            expected = plain.reconstruct_path(i, j)
+            path = blocked.reconstruct_path(i, j)
+            if expected == math.inf or expected == []:
+                assert path == expected
+            elif i != j:
+                assert path[0] == i and path[-1] == j
+                assert path_cost(graph, path) == blocked.dp[i][j]
+
+
+def test_blocked_zero_weight_cycles():
+    edges = [(0, 1, 1), (0, 2, 0), (0, 3, 0), (1, 0, 1), (1, 2, 1), (1, 3, 1), (2, 0, 0), (2, 1, 1),
+             (3, 0, 1), (3, 2, 1), (3, 4, 0), (4, 0, 0), (4, 3, 0)]
+    graph = AdjacencyMatrix(5, dtype='float64')
+    for u, v, weight in edges:
+        graph.add_edge(u, v, weight)
+    fw = FloydWarshallAlgorithm(graph)
+    fw.solve_blocked(tile_size=2, workers=1)
+    assert fw.reconstruct_path(0, 4) == [0, 3, 4]
+    check_blocked(graph, 2, 1)
+
+
+@pytest.mark.parametrize('seed', range(60))
+def test_blocked_paths_match_solve(seed):
+    n = random.Random(seed).randint(1, 11)
+    weights = [0, 0, 0, 1, 2, -1] if seed % 3 == 0 else [0, 0, 1, 2]
+    graph = random_graph(n, seed, weights)
+    for tile_size in (2, 3):
+        check_blocked(graph, tile_size, 1)
+
+
+def test_blocked_workers():
+    graph = random_graph(10, 0, [0, 0, 1, 2])
+    check_blocked(graph, 3, 2)
+
+
+def test_reconstruct_path_cycle_guard():
+    graph = AdjacencyMatrix(3, dtype='float64')
+    graph.add_edge(0, 1, 0)
+    graph.add_edge(1, 0, 0)
+    graph.add_edge(1, 2, 0)
+    fw = FloydWarshallAlgorithm(graph)
+    fw.solve()
+    fw.next[0][2], fw.next[1][2] = 1, 0
+    with pytest.raises(RuntimeError):
+        fw.reconstruct_path(0, 2)
+
+
+def test_update_edge_on_loaded_results(tmp_path):
+    graph = random_graph(5, 1, [1, 2])
+    fw = FloydWarshallAlgorithm(graph)
+    fw.solve()
+    path = tmp_path / 'apsp.bin'
+    fw.save(path)
+    loaded = FloydWarshallAlgorithm.load(path)
+    with pytest.raises(ValueError):
+        loaded.update_edge(0, 1, 1)
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from util.graph_structures import AdjacencyList, AdjacencyMatrix
+from algorithms.path_finding.dijkstra import DijkstraAlgorithm
+from algorithms.path_finding.a_star import AStarAlgorithm, LandmarkHeuristic
+from algorithms.path_finding.contraction_hierarchies import ContractionHierarchyAlgorithm
+from algorithms.path_finding.path_cache import ShortestPathCache
+
+
+def random_graph(kind, n, seed):
+    rnd = random.Random(seed)
+    graph = kind(n)
+    for _ in range(3 * n):
+        graph.add_edge(rnd.randrange(n), rnd.randrange(n), rnd.randint(1, 9))
+    return graph
+
+
+def mutate_and_check(cache, graph, seed):
+    n = len(graph)
+    rnd = random.Random(seed)
+    pairs = [(rnd.randrange(n), rnd.randrange(n)) for _ in range(20)]
+    for start, end in pairs:
+        cache.distance(start, end)
+    for _ in range(5):
+        graph.add_edge(rnd.randrange(n), rnd.randrange(n), 1)
+    fresh = DijkstraAlgorithm(graph)
+    for start, end in pairs:
+        assert cache.distance(start, end) == fresh.solve_eager(start, end)
+        path = cache.reconstruct_path(start, end)
+        assert (path == []) == (fresh.solve_eager(start, end) == float('inf'))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_dijkstra_on_matrix_is_refreshed(seed):
+    graph = random_graph(AdjacencyMatrix, 12, seed)
+    cache = ShortestPathCache(DijkstraAlgorithm(graph), graph=graph)
+    mutate_and_check(cache, graph, seed)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_dijkstra_trees_are_refreshed(seed):
+    graph = random_graph(AdjacencyMatrix, 12, seed)
+    cache = ShortestPathCache(DijkstraAlgorithm(graph), graph=graph, cache_trees=True)
+    mutate_and_check(cache, graph, seed)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_contraction_hierarchy_is_rebuilt(seed):
+    graph = random_graph(AdjacencyList, 12, seed)
+    cache = ShortestPathCache(ContractionHierarchyAlgorithm(graph), factory=ContractionHierarchyAlgorithm)
+    first = cache.algorithm
+    mutate_and_check(cache, graph, seed)
+    assert cache.algorithm is not first
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_landmarks_are_rebuilt(seed):
+    graph = random_graph(AdjacencyList, 12, seed)
+
+    def factory(graph):
+        return AStarAlgorithm(graph, LandmarkHeuristic(graph, landmarks=2))
+
+    cache = ShortestPathCache(factory(graph), factory=factory)
+    mutate_and_check(cache, graph, seed)
+
+
+def test_no_factory_raises():
+    graph = random_graph(AdjacencyList, 6, 0)
+    cache = ShortestPathCache(ContractionHierarchyAlgorithm(graph))
+    cache.distance(0, 1)
+    graph.add_edge(0, 1, 1)
+    with pytest.raises(ValueError):
+        cache.distance(0, 1)
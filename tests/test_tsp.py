@@ -0,0 +1,24 @@
+from util.graph_structures import AdjacencyList
+from algorithms.path_finding.tsp import TSPAlgorithm
+
+
+def road_network():
+    roads = AdjacencyList(8)
+    for a, b, cost in [(0, 1, 4), (1, 2, 3), (2, 3, 2), (3, 4, 6), (4, 5, 1), (5, 6, 2), (6, 7, 5), (7, 0, 3),
+                       (1, 5, 7), (2, 6, 4)]:
+        roads.add_edge(a, b, cost, directed=False)
+    return roads
+
+
+def test_repeated_waypoints():
+    roads = road_network()
+    expected = TSPAlgorithm(roads, start_node=5, waypoints=[5, 3, 0, 6])
+    for waypoints in ([5, 3, 3, 0, 6], [0, 5, 3, 0, 6, 5], [3, 5, 6, 3, 0]):
+        tsp = TSPAlgorithm(roads, start_node=5, waypoints=waypoints)
+        tour = tsp.get_tour()
+        assert tour[0] == tour[-1] == 5
+        assert sorted(tour[:-1]) == [0, 3, 5, 6]
+        assert tsp.get_tour_cost() == expected.get_tour_cost()
+        route = tsp.get_route()
+        assert route[0] == route[-1] == 5
+        assert sum(dict(roads[a])[b] for a, b in zip(route, route[1:])) == tsp.get_tour_cost()
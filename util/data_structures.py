@@ -1,39 +1,246 @@
-import heapq
-
 class IndexedPriorityQueue:
-    def __init__(self):
-        self.heap = []  # Min-heap to store (priority, index)
+
+    # Indexed d-ary min-heap. Every index appears at most once in the heap and index_map keeps
+    # its position, so changing the priority of an index or removing it is done in place in
+    # O(log(n)) and the heap never holds more entries than distinct indexes.
+    # Entries are (priority, counter, index) tuples, the counter breaks ties between equal
+    # priorities in insertion order. Larger arities make the heap shallower, which speeds up
+    # decrease-key heavy workloads such as Dijkstra on dense graphs at the cost of slower pops.
+
+    def __init__(self, arity=2):
+        if arity < 2:
+            raise ValueError("The arity of the heap must be at least 2")
+        self.arity = arity
+        self.heap = []  # Min-heap to store (priority, counter, index)
         self.index_map = {}  # Map from index to position in the heap
         self.counter = 0  # Counter for tie-breaking in case of equal priorities
 
+    def __len__(self):
+        return len(self.heap)
+
     def push(self, index, priority):
         if index in self.index_map:
             self.update(index, priority)
         else:
-            entry = (priority, self.counter, index)
-            self.index_map[index] = entry
-            heapq.heappush(self.heap, entry)
+            self.heap.append((priority, self.counter, index))
+            self.index_map[index] = len(self.heap) - 1
             self.counter += 1
+            self.sift_up(len(self.heap) - 1)
 
     def pop(self):
-        while self.heap:
-            priority, _, index = heapq.heappop(self.heap)
-            # Check if the current entry is the most recent one for this index
-            if index in self.index_map and self.index_map[index] == (priority, _, index):
-                del self.index_map[index]
-                return index, priority
-        raise KeyError("Pop from an empty priority queue")
+        if not self.heap:
+            raise KeyError("Pop from an empty priority queue")
+        priority, _, index = self.heap[0]
+        self.remove_at(0)
+        return index, priority
 
     def update(self, index, new_priority):
         if index in self.index_map:
-            old_entry = self.index_map.pop(index)
-            new_entry = (new_priority, self.counter, index)
-            heapq.heappush(self.heap, new_entry)
-            self.index_map[index] = new_entry
+            position = self.index_map[index]
+            old_priority = self.heap[position][0]
+            self.heap[position] = (new_priority, self.counter, index)
             self.counter += 1
+            if new_priority < old_priority:
+                self.sift_up(position)
+            else:
+                self.sift_down(position)
         else:
             self.push(index, new_priority)
 
+    def decrease_key(self, index, new_priority):
+        # Lowers the priority of 'index' (inserting it if needed), ignoring larger priorities.
+        if index not in self.index_map or new_priority < self.heap[self.index_map[index]][0]:
+            self.update(index, new_priority)
+
+    def remove(self, index):
+        if index in self.index_map:
+            self.remove_at(self.index_map[index])
+        else:
+            raise KeyError(f"Index {index} not found in the priority queue")
+
+    def is_empty(self):
+        return len(self.index_map) == 0
+
+    def contains(self, index):
+        return index in self.index_map
+
+    def get_priority(self, index):
+        if index in self.index_map:
+            return self.heap[self.index_map[index]][0]
+        raise KeyError(f"Index {index} not found in the priority queue")
+
+    def remove_at(self, position):
+        # Replaces the entry at 'position' with the last entry and restores the heap order.
+        heap = self.heap
+        del self.index_map[heap[position][2]]
+        last = heap.pop()
+        if position < len(heap):
+            heap[position] = last
+            self.index_map[last[2]] = position
+            if position > 0 and last < heap[(position - 1) // self.arity]:
+                self.sift_up(position)
+            else:
+                self.sift_down(position)
+
+    def sift_up(self, position):
+        heap, index_map, arity = self.heap, self.index_map, self.arity
+        entry = heap[position]
+        while position > 0:
+            parent = (position - 1) // arity
+            if not entry < heap[parent]:
+                break
+            heap[position] = heap[parent]
+            index_map[heap[position][2]] = position
+            position = parent
+        heap[position] = entry
+        index_map[entry[2]] = position
+
+    def sift_down(self, position):
+        heap, index_map, arity = self.heap, self.index_map, self.arity
+        size = len(heap)
+        entry = heap[position]
+        while True:
+            first = arity * position + 1
+            if first >= size:
+                break
+            # Smallest of the children
+            child = min(range(first, min(first + arity, size)), key=heap.__getitem__)
+            if not heap[child] < entry:
+                break
+            heap[position] = heap[child]
+            index_map[heap[position][2]] = position
+            position = child
+        heap[position] = entry
+        index_map[entry[2]] = position
+
+
+class BucketQueue:
+
+    # Dial's bucket queue for non-negative integer priorities. It is monotone: every pushed
+    # priority must lie between the last popped priority and that priority plus max_delta (for
+    # Dijkstra, the largest edge weight C). max_delta + 1 circular buckets then hold the entries,
+    # so push and update are O(1) and popping scans at most C empty buckets.
+    # Updates leave the old entry behind and index_map keeps the current priority of every index,
+    # stale entries are skipped when their bucket is scanned.
+    # clear() empties the queue for reuse, touching only the buckets that were filled.
+
+    def __init__(self, max_delta):
+        if max_delta < 0:
+            raise ValueError("max_delta must be non-negative")
+        self.size = max_delta + 1
+        self.buckets = [[] for _ in range(self.size)]
+        self.used = []  # Positions of the buckets filled since the last clear
+        self.index_map = {}  # Map from index to its current priority
+        self.current = 0  # Smallest priority that can still be in the queue
+
+    def __len__(self):
+        return len(self.index_map)
+
+    def push(self, index, priority):
+        # NumPy integers (e.g. weights of a CompressedSparseRow built on ndarrays) become ints
+        priority = int(priority)
+        if priority < self.current or priority > self.current + self.size - 1:
+            raise ValueError(f"Priority {priority} out of the range of the bucket queue")
+        self.index_map[index] = priority
+        bucket = self.buckets[priority % self.size]
+        if not bucket:
+            self.used.append(priority % self.size)
+        bucket.append(index)
+
+    def update(self, index, new_priority):
+        self.push(index, new_priority)
+
+    def pop(self):
+        if not self.index_map:
+            raise KeyError("Pop from an empty priority queue")
+        while True:
+            bucket = self.buckets[self.current % self.size]
+            while bucket:
+                index = bucket.pop()
+                if self.index_map.get(index) == self.current:
+                    del self.index_map[index]
+                    return index, self.current
+            self.current += 1
+
+    def clear(self):
+        for position in self.used:
+            self.buckets[position].clear()
+        self.used.clear()
+        self.index_map.clear()
+        self.current = 0
+
+    def remove(self, index):
+        if index in self.index_map:
+            del self.index_map[index]
+        else:
+            raise KeyError(f"Index {index} not found in the priority queue")
+
+    def is_empty(self):
+        return len(self.index_map) == 0
+
+    def contains(self, index):
+        return index in self.index_map
+
+    def get_priority(self, index):
+        if index in self.index_map:
+            return self.index_map[index]
+        raise KeyError(f"Index {index} not found in the priority queue")
+
+
+class RadixHeap:
+
+    # Radix heap for non-negative integer priorities. It is monotone: pushed priorities can not be
+    # lower than the last popped one. An entry with priority p is kept in bucket
+    # (p XOR last).bit_length(), so when bucket 0 runs out the first non-empty bucket is
+    # redistributed around its minimum and every entry only moves to lower buckets: each entry is
+    # moved O(log C) times for priorities spanning a range C.
+    # Like BucketQueue, updates leave stale entries behind that are skipped later.
+
+    def __init__(self):
+        self.buckets = [[] for _ in range(65)]
+        self.index_map = {}  # Map from index to its current priority
+        self.last = 0  # Last popped priority
+
+    def __len__(self):
+        return len(self.index_map)
+
+    def push(self, index, priority):
+        # int.bit_length is needed, NumPy integers do not have it
+        priority = int(priority)
+        if priority < self.last:
+            raise ValueError(f"Priority {priority} is lower than the last popped priority {self.last}")
+        self.index_map[index] = priority
+        bucket = (priority ^ self.last).bit_length()
+        while bucket >= len(self.buckets):
+            self.buckets.append([])
+        self.buckets[bucket].append((priority, index))
+
+    def update(self, index, new_priority):
+        self.push(index, new_priority)
+
+    def pop(self):
+        if not self.index_map:
+            raise KeyError("Pop from an empty priority queue")
+        while True:
+            bucket = self.buckets[0]
+            while bucket:
+                priority, index = bucket.pop()
+                if self.index_map.get(index) == priority:
+                    del self.index_map[index]
+                    return index, priority
+            self.redistribute()
+
+    def redistribute(self):
+        # Empties the first non-empty bucket into the lower ones, around its smallest live priority.
+        for bucket in self.buckets[1:]:
+            live = [entry for entry in bucket if self.index_map.get(entry[1]) == entry[0]]
+            bucket.clear()
+            if live:
+                self.last = min(live)[0]
+                for priority, index in live:
+                    self.buckets[(priority ^ self.last).bit_length()].append((priority, index))
+                return None
+
     def remove(self, index):
         if index in self.index_map:
             del self.index_map[index]
@@ -48,5 +255,5 @@ class IndexedPriorityQueue:
 
     def get_priority(self, index):
         if index in self.index_map:
-            return self.index_map[index][0]
+            return self.index_map[index]
         raise KeyError(f"Index {index} not found in the priority queue")
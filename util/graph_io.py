@@ -0,0 +1,139 @@
+from util.graph_structures import AdjacencyList, CompressedSparseRow
+import mmap
+import struct
+import sys
+
+# Binary graph file format (all fields little-endian, every section 8 byte aligned):
+#
+#   offset  size        field
+#   0       6           magic b'GTCSR1'
+#   6       1           weight typecode: b'q' (int64) or b'd' (float64)
+#   7       1           padding (zero)
+#   8       8           n: number of nodes (uint64)
+#   16      8           m: number of edges (uint64)
+#   24      8           reserved (zero)
+#   32      8*(n+1)     offsets (int64)
+#   ...     8*m         targets (int64)
+#   ...     8*m         weights (int64 or float64)
+#
+# The three sections are exactly the arrays of a CompressedSparseRow, so a file can be opened
+# with mmap and used in place: no parsing, no copying, and every process that opens the same file
+# shares a single copy of it in the OS page cache.
+
+MAGIC = b'GTCSR1'
+HEADER = struct.Struct('<6scxQQQ')
+
+
+def save_graph(graph, path):
+    # Write an AdjacencyList, AdjacencyMatrix or CompressedSparseRow to 'path' in the binary format.
+    if sys.byteorder != 'little':
+        raise OSError("The binary graph format requires a little-endian platform!")
+    if not isinstance(graph, CompressedSparseRow):
+        graph = CompressedSparseRow(graph)
+    for section in (graph.offsets, graph.targets):
+        if section_typecode(section) != 'q':
+            raise TypeError("Offsets and targets must be stored as int64!")
+    typecode = section_typecode(graph.weights)
+    if typecode not in ('q', 'd'):
+        raise TypeError("Weights must be stored as int64 ('q') or float64 ('d')!")
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, typecode.encode(), graph.n, graph.m, 0))
+        for section in (graph.offsets, graph.targets, graph.weights):
+            f.write(memoryview(section).cast('B'))
+
+
+def section_typecode(section):
+    # Returns 'q' for 64 bit integer buffers, 'd' for doubles and None otherwise.
+    view = memoryview(section)
+    if view.itemsize != 8:
+        return None
+    if view.format in ('q', 'l', '<q', '<l', '=q', '=l'):
+        return 'q'
+    if view.format in ('d', '<d', '=d'):
+        return 'd'
+    return None
+
+
+def map_file(path):
+    # Maps a whole file read-only into memory.
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def load_graph(path):
+    # Open a graph written by save_graph as a read-only, memory-mapped CompressedSparseRow.
+    # The arrays of the returned graph are views into the mapping, which stays open for as long
+    # as the graph is referenced.
+    if sys.byteorder != 'little':
+        raise OSError("The binary graph format requires a little-endian platform!")
+    buffer = map_file(path)
+
+    if len(buffer) < HEADER.size:
+        raise ValueError("File is too small to be a binary graph!")
+    magic, typecode, n, m, _ = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("File is not a binary graph!")
+    typecode = typecode.decode()
+    if typecode not in ('q', 'd'):
+        raise ValueError(f"Unknown weight typecode {typecode!r}!")
+    if len(buffer) != HEADER.size + 8 * (n + 1 + 2 * m):
+        raise ValueError("File size does not match its header!")
+
+    view = memoryview(buffer)
+    start = HEADER.size
+    offsets = view[start:start + 8 * (n + 1)].cast('q')
+    start += 8 * (n + 1)
+    targets = view[start:start + 8 * m].cast('q')
+    start += 8 * m
+    weights = view[start:start + 8 * m].cast(typecode)
+    return CompressedSparseRow.from_arrays(offsets, targets, weights)
+
+
+def read_edge_list(path, delimiter=None, from_column=0, to_column=1, weight_column=None,
+                   weight_type=float, skip_header=False, comment='#', chunk_size=1 << 20):
+    # Streams the edges of a CSV/TSV edge list file as (from_node, to_node) tuples, or as
+    # (from_node, to_node, weight) tuples when a weight_column is given. Lines are split on
+    # 'delimiter' (any whitespace if None, ',' for CSV, '\t' for TSV); empty lines and lines
+    # starting with 'comment' are skipped. The file is read roughly chunk_size bytes at a time
+    # so memory stays bounded regardless of the file size. Quoted fields are not supported.
+    with open(path, 'r') as f:
+        if skip_header:
+            f.readline()
+        while True:
+            lines = f.readlines(chunk_size)
+            if not lines:
+                break
+            for line in lines:
+                if not line.strip() or (comment and line.startswith(comment)):
+                    continue
+                fields = line.split(delimiter)
+                if weight_column is None:
+                    yield int(fields[from_column]), int(fields[to_column])
+                else:
+                    yield int(fields[from_column]), int(fields[to_column]), weight_type(fields[weight_column])
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    graph = AdjacencyList(5)
+    graph.add_edge(0, 1, 4)
+    graph.add_edge(0, 2, 1)
+    graph.add_edge(1, 3, 1)
+    graph.add_edge(2, 1, 2)
+    graph.add_edge(2, 3, 5)
+    graph.add_edge(3, 4, 3)
+
+    path = os.path.join(tempfile.mkdtemp(), 'graph.bin')
+    save_graph(graph, path)
+    loaded = load_graph(path)
+    print([loaded[i] for i in range(len(loaded))])
+
+    edge_list = os.path.join(tempfile.mkdtemp(), 'edges.csv')
+    with open(edge_list, 'w') as f:
+        f.write("from,to,cost\n0,1,4\n0,2,1\n1,3,1\n2,1,2\n2,3,5\n3,4,3\n")
+    graph = AdjacencyList(5)
+    graph.add_edges(read_edge_list(edge_list, delimiter=',', weight_column=2, weight_type=int, skip_header=True))
+    print(graph.graph)
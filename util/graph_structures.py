@@ -1,10 +1,21 @@
 import math
+import itertools
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class AdjacencyList:
 
     # Adjacency List representation of a graph
 
     def __init__(self, source):
+        # Incremented on every mutation so that cached conversions can be invalidated. Writing to
+        # self.graph directly (e.g. graph.graph[i][j] = w) bypasses it: increment it by hand then.
+        self.version = 0
+        self.conversions = {}
         if isinstance(source, int):
             # Build an adjacency list from scratch
             self.n = source
@@ -14,9 +25,13 @@ class AdjacencyList:
             self.n = len(source)
             self.graph = [[] for _ in range(self.n)]
             for i in range(self.n):
-                for j in range(self.n):
-                    if source.graph[i][j] != math.inf and i != j:
-                        self.graph[i].append((j, source.graph[i][j]))
+                for j, weight in source.entries(i):
+                    if i != j:
+                        self.graph[i].append((j, weight))
+        elif isinstance(source, CompressedSparseRow):
+            # Convert the CompressedSparseRow into an AdjacencyList
+            self.n = len(source)
+            self.graph = [source[i] for i in range(self.n)]
         elif isinstance(source, BinaryNode):
             # Helper function to recursively traverse the tree
             def traverse(node):
@@ -42,7 +57,7 @@ class AdjacencyList:
             self.graph = [[] for _ in range(self.n)]
             traverse(source)
         else:
-            raise TypeError("Argument must be an integer or an AdjacencyMatrix instance!")
+            raise TypeError("Argument must be an integer, an AdjacencyMatrix or a CompressedSparseRow instance!")
 
     def __len__(self):
         return len(self.graph)
@@ -50,55 +65,373 @@ class AdjacencyList:
     def __getitem__(self, index):
         return self.graph[index]
     
+    def __getstate__(self):
+        # Cached conversions are rebuilt on demand, so they are left out of pickles (e.g. of a
+        # graph sent to the worker processes of a pool).
+        state = self.__dict__.copy()
+        del state['conversions']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.conversions = {}
+
     def add_edge(self, from_node, to_node, weight=0, directed=True):
+        self.version += 1
         self.graph[from_node].append((to_node, weight))
         if directed is False:
             self.graph[to_node].append((from_node, weight))
 
+    def add_edges(self, edges, weight=0, directed=True):
+        # Adds many edges at once. 'edges' is either an iterable of (from_node, to_node) or
+        # (from_node, to_node, weight) tuples, such as the generator returned by
+        # util.graph_io.read_edge_list, or a NumPy array with 2 or 3 columns. Edges without a
+        # weight get 'weight'. Iterables are consumed lazily, so memory use stays bounded.
+        self.version += 1
+        if np is not None and isinstance(edges, np.ndarray):
+            edges = self.array_edges(edges)
+
+        edges = iter(edges)
+        first = next(edges, None)
+        if first is None:
+            return
+        edges = itertools.chain([first], edges)
+        if len(first) == 2:
+            edges = ((from_node, to_node, weight) for from_node, to_node in edges)
+
+        graph = self.graph
+        if directed:
+            for from_node, to_node, edge_weight in edges:
+                graph[from_node].append((to_node, edge_weight))
+        else:
+            for from_node, to_node, edge_weight in edges:
+                graph[from_node].append((to_node, edge_weight))
+                graph[to_node].append((from_node, edge_weight))
+
+    @staticmethod
+    def array_edges(edges, chunk_size=1 << 16):
+        # Yields the rows of an (m, 2) or (m, 3) NumPy array as Python tuples, converting one
+        # chunk at a time. Node columns are cast to integers.
+        if edges.ndim != 2 or edges.shape[1] not in (2, 3):
+            raise ValueError("Edge arrays must have shape (m, 2) or (m, 3)!")
+        for start in range(0, len(edges), chunk_size):
+            chunk = edges[start:start + chunk_size]
+            columns = [chunk[:, 0].astype(np.int64).tolist(), chunk[:, 1].astype(np.int64).tolist()]
+            if edges.shape[1] == 3:
+                columns.append(chunk[:, 2].tolist())
+            yield from zip(*columns)
+
+    def to_adjacency_matrix(self, dtype=None, sparse=False):
+        # Returns this graph as an AdjacencyMatrix, converting it only once per version.
+        return cached_conversion(self, AdjacencyMatrix, dtype, sparse)
+
+    def to_reversed(self):
+        # Returns the graph with every edge reversed, built only once per version.
+        return cached_conversion(self, reverse_graph)
+
 
 class AdjacencyMatrix:
 
     # Adjacency Matrix representation of a graph
 
-    def __init__(self, source):
+    def __init__(self, source, dtype=None, sparse=False):
+        # If a NumPy dtype is given (e.g. 'float64' or 'float32') the matrix is stored as a dense
+        # ndarray instead of a list of lists, which lets FloydWarshallAlgorithm run vectorized.
+        # If sparse is True each row is a SparseRow that only stores the entries that were set,
+        # so a matrix of a sparse graph takes O(V+E) memory instead of O(V^2).
+        if sparse and dtype is not None:
+            raise ValueError("A sparse AdjacencyMatrix cannot have a dtype!")
+        self.dtype = dtype
+        self.sparse = sparse
+        # Incremented on every mutation so that cached conversions can be invalidated. Writing to
+        # self.graph directly (e.g. graph.graph[i][j] = w) bypasses it: increment it by hand then.
+        self.version = 0
+        self.conversions = {}
+        if np is not None and isinstance(source, np.ndarray):
+            # A 2-D ndarray (e.g. from distance_matrix) is read as its sequence of rows
+            source = source.tolist()
         if isinstance(source, int):
             # Build an adjacency matrix from scratch
             self.n = source
-            self.graph = [[math.inf] * source for _ in range(source)]
-            # Fill main diagonal with 0
-            for i in range(source):
-                self.graph[i][i] = 0
+            self.graph = self.empty_matrix(self.n, dtype, sparse)
         
         elif isinstance(source, AdjacencyList):
             # Convert the AdjacencyList into an AdjacencyMatrix
             self.n = len(source)
-            self.graph = [[math.inf] * self.n for _ in range(self.n)]
-            # Fill main diagonal with 0
-            for i in range(self.n):
-                self.graph[i][i] = 0
+            self.graph = self.empty_matrix(self.n, dtype, sparse)
             for from_node, edges in enumerate(source):
+                row = self.graph[from_node]
                 for to_node, weight in edges:
-                    self.graph[from_node][to_node] = weight
+                    row[to_node] = weight
+        elif isinstance(source, AdjacencyMatrix):
+            # Copy the AdjacencyMatrix, possibly changing its storage
+            self.n = len(source)
+            self.graph = self.empty_matrix(self.n, dtype, sparse)
+            for i in range(self.n):
+                row = self.graph[i]
+                for j, weight in source.entries(i):
+                    row[j] = weight
+        elif isinstance(source, (list, tuple)):
+            # Build the AdjacencyMatrix from a square sequence of rows
+            self.n = len(source)
+            self.graph = self.empty_matrix(self.n, dtype, sparse)
+            for i, source_row in enumerate(source):
+                if len(source_row) != self.n:
+                    raise ValueError("The rows must form a square matrix!")
+                row = self.graph[i]
+                for j, weight in enumerate(source_row):
+                    if weight != math.inf:
+                        row[j] = weight
+        elif isinstance(source, CompressedSparseRow):
+            # Convert the CompressedSparseRow into an AdjacencyMatrix
+            self.n = len(source)
+            self.graph = self.empty_matrix(self.n, dtype, sparse)
+            if dtype is not None:
+                # Scatter all edges at once
+                offsets = np.asarray(source.offsets)
+                rows = np.repeat(np.arange(self.n), np.diff(offsets))
+                self.graph[rows, np.asarray(source.targets)] = np.asarray(source.weights)
+            else:
+                for from_node in range(self.n):
+                    row = self.graph[from_node]
+                    lo, hi = source.offsets[from_node], source.offsets[from_node + 1]
+                    for to_node, weight in zip(source.targets[lo:hi], source.weights[lo:hi]):
+                        row[to_node] = weight
         else:
-            raise TypeError("Argument must be an integer or an AdjacencyList instance!")
+            raise TypeError("Argument must be an integer, a list of rows, an AdjacencyList, an AdjacencyMatrix or a CompressedSparseRow instance!")
+
+    @staticmethod
+    def empty_matrix(n, dtype=None, sparse=False):
+        # Returns an n x n matrix filled with math.inf and a main diagonal of 0.
+        if sparse:
+            return [SparseRow(i) for i in range(n)]
+        if dtype is None:
+            graph = [[math.inf] * n for _ in range(n)]
+            for i in range(n):
+                graph[i][i] = 0
+            return graph
+        if np is None:
+            raise ImportError("NumPy is required to build an AdjacencyMatrix with a dtype!")
+        graph = np.full((n, n), math.inf, dtype=dtype)
+        np.fill_diagonal(graph, 0)
+        return graph
+
+    def row(self, index):
+        # Returns the row of the matrix as a list of Python numbers.
+        if self.dtype is not None:
+            return self.graph[index].tolist()
+        if self.sparse:
+            row = self.graph[index]
+            return [row[j] for j in range(self.n)]
+        return self.graph[index]
+
+    def entries(self, index):
+        # Returns the (column, weight) pairs of the row whose weight is not math.inf, in column
+        # order. For sparse matrices an implicit 0 on the diagonal is not included.
+        if self.sparse:
+            return sorted((j, weight) for j, weight in self.graph[index].items() if weight != math.inf)
+        return [(j, weight) for j, weight in enumerate(self.row(index)) if weight != math.inf]
 
     def __len__(self):
         return self.n
     
     def __getitem__(self, indices):
-        i, j = indices
-        return self.graph[i][j]
+        # Supports both graph[i, j] and graph[i][j].
+        if isinstance(indices, tuple):
+            i, j = indices
+            return self.graph[i][j]
+        return self.graph[indices]
     
+    def to_adjacency_list(self):
+        # Returns this graph as an AdjacencyList, converting it only once per version.
+        return cached_conversion(self, AdjacencyList)
+
+    def to_adjacency_matrix(self, dtype=None, sparse=False):
+        # Returns this graph as an AdjacencyMatrix with the requested storage. Returns itself if
+        # the storage already matches.
+        if dtype == self.dtype and sparse == self.sparse:
+            return self
+        return cached_conversion(self, AdjacencyMatrix, dtype, sparse)
+
+    def __getstate__(self):
+        # Cached conversions are rebuilt on demand, so they are left out of pickles (e.g. of a
+        # graph sent to the worker processes of a pool).
+        state = self.__dict__.copy()
+        del state['conversions']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.conversions = {}
+
     def add_edge(self, from_node, to_node, weight=1, directed=True):
+        self.version += 1
         self.graph[from_node][to_node] = weight
         if directed is False:
             self.graph[to_node][from_node] = weight
 
 
+class SparseRow(dict):
+
+    # Row of a sparse AdjacencyMatrix. Only the entries that were set are stored, missing
+    # entries read as math.inf except the one on the main diagonal, which reads as 0.
+
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+
+    def __missing__(self, key):
+        return 0 if key == self.index else math.inf
+
+
+class CompressedSparseRow:
+
+    # Immutable Compressed Sparse Row (CSR) representation of a graph.
+    # The outgoing edges of node i are stored contiguously: their destinations in
+    # targets[offsets[i]:offsets[i+1]] and their weights at the same positions in weights.
+    # Three flat typed arrays replace the one-list-of-tuples-per-node layout of AdjacencyList,
+    # so a graph costs 16 bytes per edge instead of more than 100.
+    # Indexing a node returns its (to_node, weight) pairs, so every algorithm that reads an
+    # AdjacencyList also accepts a CompressedSparseRow without converting it.
+
+    def __init__(self, source):
+        if isinstance(source, CompressedSparseRow):
+            # Share the (immutable) buffers of another CompressedSparseRow
+            offsets, targets, weights = source.offsets, source.targets, source.weights
+        elif isinstance(source, AdjacencyList):
+            # Convert the AdjacencyList into a CompressedSparseRow
+            offsets = array('q', [0])
+            targets = array('q')
+            weights = []
+            for edges in source:
+                for to_node, weight in edges:
+                    targets.append(to_node)
+                    weights.append(weight)
+                offsets.append(len(targets))
+            weights = self.pack_weights(weights)
+        elif isinstance(source, AdjacencyMatrix):
+            # Convert the AdjacencyMatrix into a CompressedSparseRow
+            offsets = array('q', [0])
+            targets = array('q')
+            weights = []
+            for i in range(len(source)):
+                for j, weight in source.entries(i):
+                    if i != j:
+                        targets.append(j)
+                        weights.append(weight)
+                offsets.append(len(targets))
+            weights = self.pack_weights(weights)
+        else:
+            raise TypeError("Argument must be an AdjacencyList, an AdjacencyMatrix or a CompressedSparseRow instance!")
+        self.set_arrays(offsets, targets, weights)
+
+    @classmethod
+    def from_arrays(cls, offsets, targets, weights):
+        # Build a CompressedSparseRow directly on top of existing buffers (array.array,
+        # memoryview or NumPy arrays) without copying them.
+        if len(targets) != len(weights):
+            raise ValueError("targets and weights must have the same length!")
+        if len(offsets) == 0 or offsets[len(offsets) - 1] != len(targets):
+            raise ValueError("The last offset must be equal to the number of edges!")
+        csr = cls.__new__(cls)
+        csr.set_arrays(offsets, targets, weights)
+        return csr
+
+    def set_arrays(self, offsets, targets, weights):
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.n = len(offsets) - 1
+        self.m = len(targets)
+        # A CompressedSparseRow is immutable, so its version never changes
+        self.version = 0
+        self.conversions = {}
+
+    def __getstate__(self):
+        # Cached conversions are rebuilt on demand, so they are left out of pickles (e.g. of a
+        # graph sent to the worker processes of a pool).
+        state = self.__dict__.copy()
+        del state['conversions']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.conversions = {}
+
+    @staticmethod
+    def pack_weights(weights):
+        # Store integer weights as 64 bit integers so results keep the same type as with an
+        # AdjacencyList, and any other weights as doubles.
+        if all(type(weight) is int for weight in weights):
+            return array('q', weights)
+        return array('d', weights)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        lo, hi = self.offsets[index], self.offsets[index + 1]
+        return list(zip(self.targets[lo:hi], self.weights[lo:hi]))
+
+    def degree(self, index):
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def to_adjacency_list(self):
+        # Returns this graph as an AdjacencyList, converting it only once.
+        return cached_conversion(self, AdjacencyList)
+
+    def to_adjacency_matrix(self, dtype=None, sparse=False):
+        # Returns this graph as an AdjacencyMatrix, converting it only once.
+        return cached_conversion(self, AdjacencyMatrix, dtype, sparse)
+
+    def to_reversed(self):
+        # Returns the graph with every edge reversed, built only once.
+        return cached_conversion(self, reverse_graph)
+
+
+def reverse_graph(source):
+    # Builds a CompressedSparseRow holding every edge of 'source' reversed. The incoming edges of
+    # each node keep the order in which their sources appear.
+    n = len(source)
+    offsets = array('q', [0]) * (n + 1)
+    for from_node in range(n):
+        for to_node, _ in source[from_node]:
+            offsets[to_node + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    targets = array('q', [0]) * offsets[n]
+    weights = [0] * offsets[n]
+    fill = offsets[:-1]
+    for from_node in range(n):
+        for to_node, weight in source[from_node]:
+            targets[fill[to_node]] = from_node
+            weights[fill[to_node]] = weight
+            fill[to_node] += 1
+    return CompressedSparseRow.from_arrays(offsets, targets, CompressedSparseRow.pack_weights(weights))
+
+
+def cached_conversion(source, kind, *args):
+    # Converts 'source' into 'kind(source, *args)' and caches the result on 'source'. The cached
+    # graph is reused as long as neither the source nor the converted graph has been mutated
+    # through add_edge/add_edges since the conversion (their version counters are unchanged).
+    # Direct writes to the 'graph' attribute do not change the version and are not detected.
+    key = (kind,) + args
+    cached = source.conversions.get(key)
+    if cached is not None:
+        source_version, converted, converted_version = cached
+        if source_version == source.version and converted_version == converted.version:
+            return converted
+    converted = kind(source, *args)
+    source.conversions[key] = (source.version, converted, converted.version)
+    return converted
+
+
 class BinaryNode:
 
     # Build a Binary Tree structure.
 
+    __slots__ = ('index', 'value', 'left', 'right')
+
     def __init__(self, index, value=None):
         self.index = index
         self.value = value
@@ -110,12 +443,65 @@ class Node:
 
     # Build a Tree structure.
 
+    __slots__ = ('index', 'value', 'children')
+
     def __init__(self, index, value=None):
         self.index = index
         self.value = value
         self.children = []
 
 
+class ArrayTree:
+
+    # Rooted tree stored in flat arrays instead of linked Node objects.
+    # parent[i] is the parent of node i (-1 for the root and for nodes outside the tree),
+    # preorder lists the nodes of the tree so that every parent comes before its children, and
+    # the children of node i are children[child_offsets[i]:child_offsets[i+1]].
+    # Algorithms walk the preorder (or its reverse for bottom-up passes) instead of recursing,
+    # so deep trees cannot hit the recursion limit. Indexing a node returns its (neighbor, 0)
+    # pairs like an undirected AdjacencyList, so graph algorithms accept an ArrayTree as well.
+
+    def __init__(self, root, parent, preorder):
+        self.root = root
+        self.n = len(parent)
+        self.parent = parent
+        self.preorder = preorder
+        # Count the children of every node and turn the counts into offsets
+        self.child_offsets = array('q', [0]) * (self.n + 1)
+        for node in preorder:
+            if node != root:
+                self.child_offsets[parent[node] + 1] += 1
+        for i in range(self.n):
+            self.child_offsets[i + 1] += self.child_offsets[i]
+        # Preorder visits the children of every node in order, so filling them in
+        # preorder keeps that order.
+        self.children = array('q', [0]) * (len(preorder) - 1 if preorder else 0)
+        fill = self.child_offsets[:-1]
+        for node in preorder:
+            if node != root:
+                self.children[fill[parent[node]]] = node
+                fill[parent[node]] += 1
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        edges = [(child, 0) for child in self.get_children(index)]
+        if self.parent[index] != -1:
+            edges.append((self.parent[index], 0))
+        return edges
+
+    def get_children(self, index):
+        return self.children[self.child_offsets[index]:self.child_offsets[index + 1]]
+
+    def is_leaf_node(self, index):
+        return self.child_offsets[index] == self.child_offsets[index + 1]
+
+    def to_reversed(self):
+        # Tree edges are undirected, so the reversed graph is the tree itself.
+        return self
+
+
 if __name__ == "__main__":
     graph = AdjacencyList(n=14)
     graph.add_edge(0, 1)
@@ -1,4 +1,4 @@
-from util.graph_structures import AdjacencyList, AdjacencyMatrix
+from util.graph_structures import AdjacencyList, AdjacencyMatrix, CompressedSparseRow
 import networkx as nx
 import matplotlib.pyplot as plt
 
@@ -8,8 +8,8 @@ def view_graph(graph, directed=True):
     else:
         G = nx.Graph()
 
-    if isinstance(graph, AdjacencyMatrix):
-        graph = AdjacencyList(graph)
+    if isinstance(graph, (AdjacencyMatrix, CompressedSparseRow)):
+        graph = graph.to_adjacency_list()
 
     if isinstance(graph, AdjacencyList):
         is_weighted = False